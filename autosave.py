@@ -0,0 +1,82 @@
+"""
+Background Save Writer
+
+Serializes and writes game saves on a background thread so the game thread only
+pays for taking a snapshot of the state. Requests that arrive while a write is
+in progress are merged: only the newest pending snapshot is written.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from save_format import SaveLog
+
+
+class BackgroundSaveWriter:
+    """Owns a SaveLog and writes the newest requested state on a worker thread."""
+
+    def __init__(self, save_log: SaveLog,
+                 on_saved: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.save_log = save_log
+        self.on_saved = on_saved  # Called on the writer thread with the new file header
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._pending: Optional[Tuple[Dict[str, Any], str, int]] = None
+        self._requested = 0  # Ticket of the newest request
+        self._written = 0  # Ticket of the newest request written (or failed)
+        self._closed = False
+        self.coalesced = 0  # Requests replaced by a newer one before being written
+        self.last_result: Optional[str] = None
+        self.last_error: Optional[Exception] = None
+
+        self._thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+        self._thread.start()
+
+    def request(self, state: Dict[str, Any], timestamp: str) -> int:
+        """Queue a state snapshot for writing and return its ticket without waiting.
+
+        The snapshot must not be modified afterwards; it is serialized on the writer thread.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Save writer is closed")
+            if self._pending is not None:
+                self.coalesced += 1
+            self._requested += 1
+            self._pending = (state, timestamp, self._requested)
+            self._changed.notify_all()
+            return self._requested
+
+    def wait(self, ticket: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """Wait until a ticket (default: every request so far) is written."""
+        with self._lock:
+            target = self._requested if ticket is None else ticket
+            return self._changed.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Write any pending request, then stop the worker thread."""
+        with self._lock:
+            self._closed = True
+            self._changed.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._changed.wait_for(lambda: self._pending is not None or self._closed)
+                if self._pending is None:
+                    return  # Closed with nothing left to write
+                state, timestamp, ticket = self._pending
+                self._pending = None
+
+            try:
+                self.last_result = self.save_log.write(state, timestamp)
+                if self.on_saved is not None and self.last_result != "unchanged":
+                    self.on_saved(self.save_log.last_header)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+
+            with self._lock:
+                self._written = ticket
+                self._changed.notify_all()
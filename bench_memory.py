@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Memory Benchmark for Core Game Objects
+
+Reports bytes per instance for techniques, players and enemies, and the peak
+resident set size after allocating one million enemies. Run it before and after
+changes to the character classes to track memory use in mass simulations.
+"""
+
+import sys
+import tracemalloc
+from typing import Callable
+
+from character import CursedTechnique, Player, Enemy
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def bytes_per_instance(factory: Callable[[], object], count: int = 10000) -> float:
+    """Measure the average traced allocation per object created by factory."""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    objects = [factory() for _ in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del objects
+    return (after - before) / count
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in megabytes."""
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    """Run the memory benchmark."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    print("=== MEMORY BENCHMARK ===")
+    print(f"CursedTechnique: {bytes_per_instance(lambda: CursedTechnique('Strike', 25, 10, 'A strike.')):8.1f} bytes/instance")
+    print(f"Enemy:           {bytes_per_instance(lambda: Enemy('Cursed Spirit', 80, 40)):8.1f} bytes/instance (incl. technique)")
+    print(f"Player:          {bytes_per_instance(lambda: Player('Sorcerer'), 1000):8.1f} bytes/instance (incl. techniques)")
+
+    baseline = peak_rss_mb()
+    enemies = [Enemy("Cursed Spirit", 80, 40) for _ in range(count)]
+    print(f"\nPeak RSS with {len(enemies):,} enemies: {peak_rss_mb():.1f} MB "
+          f"(baseline {baseline:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
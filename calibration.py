@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Difficulty Calibration
+
+Offline step that simulates every enemy type against reference player builds at
+each level and solves for the HP/CE bonus that hits a target win rate. The result
+is written to the difficulty table that StoryManager._create_enemy looks up, so
+the game itself never runs a simulation.
+"""
+
+import json
+import multiprocessing
+import random
+from typing import Dict, List, Optional, Tuple
+
+from simulation import (ENEMY_TYPES, MAX_LEVEL, create_base_enemy, create_build,
+                        release_enemy, simulate_fight)
+from story import DIFFICULTY_TABLE_FILE, scale_enemy
+
+
+REFERENCE_BUILDS = ["balanced", "focused", "aggressive", "compassionate"]
+TARGET_WIN_RATE = 0.7
+CE_PER_HP = 0.5  # Cursed energy bonus per point of HP bonus (matches +10 HP / +5 CE)
+HP_RESOLUTION = 5  # HP bonuses are solved to the nearest multiple of this
+MAX_HP_BONUS = 1000
+
+
+def measure_win_rate(enemy_type: str, level: int, hp_bonus: int, fights: int = 20,
+                     seed: int = 0) -> float:
+    """Average win rate of the reference builds against an enemy with the given HP bonus."""
+    # Common random numbers: each bonus is measured against the same dice rolls,
+    # which keeps the win rate monotone enough to bisect on
+    random.seed(f"{seed}:{enemy_type}:{level}")
+
+    wins = 0
+    total = 0
+    ce_bonus = int(hp_bonus * CE_PER_HP)
+    for build_name in REFERENCE_BUILDS:
+        for _ in range(fights):
+            player = create_build(build_name, level)
+            enemy = scale_enemy(create_base_enemy(enemy_type), level, hp_bonus, ce_bonus)
+            if simulate_fight(player, enemy):
+                wins += 1
+            release_enemy(enemy)
+            total += 1
+
+    return wins / total if total else 0.0
+
+
+def solve_hp_bonus(enemy_type: str, level: int, target: float = TARGET_WIN_RATE,
+                   fights: int = 20, seed: int = 0) -> int:
+    """Bisect for the largest HP bonus that keeps the win rate at or above the target."""
+    low, high = 0, MAX_HP_BONUS // HP_RESOLUTION
+
+    if measure_win_rate(enemy_type, level, 0, fights, seed) < target:
+        return 0
+    if measure_win_rate(enemy_type, level, high * HP_RESOLUTION, fights, seed) >= target:
+        return high * HP_RESOLUTION
+
+    # Invariant: win rate at low >= target, at high < target
+    while high - low > 1:
+        mid = (low + high) // 2
+        if measure_win_rate(enemy_type, level, mid * HP_RESOLUTION, fights, seed) >= target:
+            low = mid
+        else:
+            high = mid
+
+    return low * HP_RESOLUTION
+
+
+def _calibrate_cell(task: Tuple[str, int, float, int, int]) -> Tuple[str, int, int]:
+    """Solve a single enemy type and level."""
+    enemy_type, level, target, fights, seed = task
+    return enemy_type, level, solve_hp_bonus(enemy_type, level, target, fights, seed)
+
+
+def calibrate(enemy_types: Optional[List[str]] = None, max_level: int = MAX_LEVEL,
+              target: float = TARGET_WIN_RATE, fights: int = 20, seed: int = 0,
+              processes: Optional[int] = None, pool=None) -> Dict[str, List[List[int]]]:
+    """Build the difficulty table: enemy type -> [hp_bonus, ce_bonus] for levels 1..max_level.
+
+    Pass a WarmSimulationPool as pool to reuse its workers instead of starting new ones.
+    """
+    enemy_types = list(enemy_types or ENEMY_TYPES)
+    tasks = [(enemy_type, level, target, fights, seed)
+             for enemy_type in enemy_types
+             for level in range(1, max_level + 1)]
+
+    table = {enemy_type: [[0, 0] for _ in range(max_level)] for enemy_type in enemy_types}
+    if pool is None:
+        with multiprocessing.Pool(processes) as new_pool:
+            return calibrate(enemy_types, max_level, target, fights, seed, pool=new_pool)
+
+    for enemy_type, level, hp_bonus in pool.imap_unordered(_calibrate_cell, tasks):
+        table[enemy_type][level - 1] = [hp_bonus, int(hp_bonus * CE_PER_HP)]
+
+    return table
+
+
+def write_table(table: Dict[str, List[List[int]]], target: float = TARGET_WIN_RATE,
+                path: str = DIFFICULTY_TABLE_FILE):
+    """Write the difficulty table file read by the story system."""
+    # One line per enemy type keeps the file readable and diffs small
+    enemies = ",\n".join(f"    {json.dumps(enemy_type)}: {json.dumps(curve)}"
+                         for enemy_type, curve in table.items())
+    with open(path, 'w') as f:
+        f.write("{\n")
+        f.write(f'  "target_win_rate": {json.dumps(target)},\n')
+        f.write(f'  "reference_builds": {json.dumps(REFERENCE_BUILDS)},\n')
+        f.write(f'  "enemies": {{\n{enemies}\n  }}\n')
+        f.write("}\n")
+
+
+def main():
+    """Recalibrate all enemy types and rewrite the difficulty table."""
+    print(f"Calibrating {len(ENEMY_TYPES)} enemy types for levels 1-{MAX_LEVEL} "
+          f"(target win rate {TARGET_WIN_RATE:.0%})...")
+    table = calibrate()
+    write_table(table)
+
+    for enemy_type, curve in table.items():
+        print(f"{enemy_type:<24}" + " ".join(str(hp) for hp, _ in curve))
+    print(f"Wrote {DIFFICULTY_TABLE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
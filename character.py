@@ -4,8 +4,11 @@ Character System with Traits and Evolution
 Defines player and NPC characters, trait systems, and character progression.
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Mapping, NamedTuple, Optional, Tuple
+from types import MappingProxyType
+from array import array
 from enum import Enum
+from functools import lru_cache
 import random
 
 
@@ -21,40 +24,164 @@ class Trait(Enum):
     CAUTIOUS = "Cautious"
 
 
+# Traits are stored in a fixed array in Trait order, and dominant traits as a
+# bitmask with one bit per trait at the same position
+TRAIT_INDEX: Dict[Trait, int] = {trait: i for i, trait in enumerate(Trait)}
+TRAIT_BIT: Dict[Trait, int] = {trait: 1 << i for trait, i in TRAIT_INDEX.items()}
+DOMINANT_TRAIT_THRESHOLD = 60
+
+# Dominant trait tuple for every possible mask, so lookups never allocate
+_TRAITS_BY_MASK: Tuple[Tuple[Trait, ...], ...] = tuple(
+    tuple(trait for trait, bit in TRAIT_BIT.items() if mask & bit)
+    for mask in range(1 << len(Trait))
+)
+
+
+def trait_mask(traits: Iterable[Trait]) -> int:
+    """Combine traits into a bitmask for dominant-trait queries."""
+    mask = 0
+    for trait in traits:
+        mask |= TRAIT_BIT[trait]
+    return mask
+
+
+# Progression: experience per level and stat gains per level gained
+XP_PER_LEVEL = 100
+HP_PER_LEVEL = 20
+CE_PER_LEVEL = 10
+
+
+class TechniqueDefinition(NamedTuple):
+    """Immutable properties of a cursed technique, shared by every owner."""
+    name: str
+    damage: int
+    cost: int  # Cursed energy cost
+    description: str
+    technique_type: str = "offensive"  # offensive, defensive, utility
+    cooldown: int = 0
+
+
 class CursedTechnique:
-    """Represents a cursed technique with its properties."""
+    """A character's copy of a cursed technique: a shared definition plus per-owner state."""
+    
+    # Slotted: simulations allocate these by the million
+    __slots__ = ('definition', 'current_cooldown', 'uses')
     
     def __init__(self, name: str, damage: int, cost: int, description: str, 
                  technique_type: str = "offensive", cooldown: int = 0):
-        self.name = name
-        self.damage = damage
-        self.cost = cost  # Cursed energy cost
-        self.description = description
-        self.technique_type = technique_type  # offensive, defensive, utility
-        self.cooldown = cooldown
+        self.definition = TechniqueDefinition(name, damage, cost, description,
+                                              technique_type, cooldown)
         self.current_cooldown = 0
+        self.uses = 0
+    
+    @classmethod
+    def from_definition(cls, definition: TechniqueDefinition) -> 'CursedTechnique':
+        """Create per-owner state for a shared technique definition."""
+        technique = cls.__new__(cls)
+        technique.definition = definition
+        technique.current_cooldown = 0
+        technique.uses = 0
+        return technique
+    
+    @property
+    def name(self) -> str:
+        return self.definition.name
+    
+    @property
+    def damage(self) -> int:
+        return self.definition.damage
+    
+    @property
+    def cost(self) -> int:
+        return self.definition.cost
+    
+    @property
+    def description(self) -> str:
+        return self.definition.description
+    
+    @property
+    def technique_type(self) -> str:
+        return self.definition.technique_type
+    
+    @property
+    def cooldown(self) -> int:
+        return self.definition.cooldown
     
     def can_use(self, cursed_energy: int) -> bool:
         """Check if the technique can be used."""
-        return cursed_energy >= self.cost and self.current_cooldown == 0
+        return cursed_energy >= self.definition.cost and self.current_cooldown == 0
     
     def use(self) -> int:
         """Use the technique and return damage/effect value."""
         if self.current_cooldown > 0:
             return 0
         
-        self.current_cooldown = self.cooldown
-        return self.damage
+        self.start_cooldown()
+        return self.definition.damage
+    
+    def start_cooldown(self):
+        """Put the technique on cooldown after it has been used."""
+        self.current_cooldown = self.definition.cooldown
+        self.uses += 1
     
     def reduce_cooldown(self):
         """Reduce cooldown by 1 turn."""
         if self.current_cooldown > 0:
             self.current_cooldown -= 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a save entry: the catalog id plus per-owner state.
+        
+        Techniques that are not in the catalog keep their whole definition.
+        """
+        from cursed_techniques import get_technique_library
+        key = get_technique_library().get_key(self.definition)
+        data: Dict[str, Any] = {'id': key} if key else {'definition': self.definition._asdict()}
+        data['current_cooldown'] = self.current_cooldown
+        data['uses'] = self.uses
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CursedTechnique':
+        """Create a technique from a save entry, sharing the catalog definition."""
+        from cursed_techniques import get_technique_library
+        library = get_technique_library()
+        if 'id' in data:
+            definition = library.get_definition(data['id'])
+            if definition is None:
+                raise ValueError(f"Unknown technique id: {data['id']}")
+        else:
+            # Inline definitions, and the flat entries of saves from before technique ids
+            fields = data.get('definition', data)
+            definition = TechniqueDefinition(**{field: fields[field]
+                                                for field in TechniqueDefinition._fields})
+            key = library.get_key(definition)
+            if key:
+                definition = library.get_definition(key)
+        
+        technique = cls.from_definition(definition)
+        technique.current_cooldown = data.get('current_cooldown', 0)
+        technique.uses = data.get('uses', 0)
+        return technique
+
+
+@lru_cache(maxsize=256)
+def _enemy_assault(enemy_name: str) -> TechniqueDefinition:
+    """Basic attack definition shared by every enemy with the same name."""
+    return TechniqueDefinition(
+        f"{enemy_name}'s Assault",
+        damage=20,
+        cost=5,
+        description=f"{enemy_name} launches a fierce attack."
+    )
 
 
 class Character:
     """Base character class for players and NPCs."""
     
+    __slots__ = ('name', 'max_hp', 'hp', 'max_cursed_energy', 'cursed_energy',
+                 'level', 'experience', '_techniques', '_technique_index', 'status_effects')
+    
     def __init__(self, name: str, max_hp: int = 100, max_cursed_energy: int = 50):
         self.name = name
         self.max_hp = max_hp
@@ -63,7 +190,8 @@ class Character:
         self.cursed_energy = max_cursed_energy
         self.level = 1
         self.experience = 0
-        self.techniques: List[CursedTechnique] = []
+        self._techniques: Tuple[CursedTechnique, ...] = ()
+        self._technique_index: Dict[str, CursedTechnique] = {}  # By technique name
         self.status_effects = {}  # Effects like poison, paralysis, etc.
     
     def is_alive(self) -> bool:
@@ -95,9 +223,31 @@ class Character:
         self.cursed_energy += actual_restore
         return actual_restore
     
+    @property
+    def techniques(self) -> Tuple[CursedTechnique, ...]:
+        """Techniques this character knows, in the order they were learned; add them with add_technique."""
+        return self._techniques
+    
+    @techniques.setter
+    def techniques(self, techniques: Iterable[CursedTechnique]):
+        self._techniques = ()
+        self._technique_index = {}
+        for technique in techniques:
+            self.add_technique(technique)
+    
     def add_technique(self, technique: CursedTechnique):
         """Add a new cursed technique."""
-        self.techniques.append(technique)
+        # Learning is rare, so the tuple is rebuilt rather than exposing a mutable list
+        self._techniques += (technique,)
+        self._technique_index[technique.name] = technique
+    
+    def has_technique(self, technique_name: str) -> bool:
+        """Check if the character knows a technique, by name."""
+        return technique_name in self._technique_index
+    
+    def get_technique(self, technique_name: str) -> Optional[CursedTechnique]:
+        """Get a known technique by name."""
+        return self._technique_index.get(technique_name)
     
     def get_available_techniques(self) -> List[CursedTechnique]:
         """Get list of techniques that can currently be used."""
@@ -140,10 +290,13 @@ class Character:
 class Player(Character):
     """Player character with traits, relationships, and progression."""
     
+    __slots__ = ('_trait_values', 'dominant_mask', 'relationships', 'transformation_active',
+                 'transformation_name', 'transformation_turns')
+    
     def __init__(self, name: str):
         super().__init__(name, max_hp=120, max_cursed_energy=60)
-        self.traits: Dict[Trait, int] = {trait: 0 for trait in Trait}
-        self.dominant_traits: List[Trait] = []
+        self._trait_values = array('B', bytes(len(TRAIT_INDEX)))  # 0-100 per trait
+        self.dominant_mask = 0
         self.relationships: Dict[str, int] = {}
         self.transformation_active = False
         self.transformation_name = ""
@@ -154,104 +307,144 @@ class Player(Character):
     
     def _initialize_basic_techniques(self):
         """Initialize the player with basic cursed techniques."""
-        basic_strike = CursedTechnique(
-            "Cursed Energy Strike",
-            damage=25,
-            cost=10,
-            description="A basic attack enhanced with cursed energy."
-        )
+        self._learn_scheduled_techniques(announce=False)
+    
+    @property
+    def traits(self) -> Mapping[Trait, int]:
+        """Read-only snapshot of every trait value; change traits with modify_trait."""
+        return MappingProxyType(dict(zip(TRAIT_INDEX, self._trait_values)))
+    
+    @traits.setter
+    def traits(self, values: Dict[Trait, int]):
+        self._trait_values = array('B', bytes(len(TRAIT_INDEX)))
+        self.dominant_mask = 0
+        for trait, value in values.items():
+            self._set_trait(trait, value)
+    
+    def _set_trait(self, trait: Trait, value: int):
+        """Store a trait value and update its dominant bit."""
+        value = max(0, min(100, value))  # Clamp 0-100
+        self._trait_values[TRAIT_INDEX[trait]] = value
         
-        energy_guard = CursedTechnique(
-            "Cursed Energy Guard",
-            damage=0,
-            cost=15,
-            description="Defensive technique that reduces incoming damage.",
-            technique_type="defensive"
-        )
-        
-        self.add_technique(basic_strike)
-        self.add_technique(energy_guard)
+        # Dominant traits are those with value >= 60
+        if value >= DOMINANT_TRAIT_THRESHOLD:
+            self.dominant_mask |= TRAIT_BIT[trait]
+        else:
+            self.dominant_mask &= ~TRAIT_BIT[trait]
+    
+    def get_trait(self, trait: Trait) -> int:
+        """Get the value of a single trait."""
+        return self._trait_values[TRAIT_INDEX[trait]]
     
     def modify_trait(self, trait: Trait, change: int):
         """Modify a character trait and update dominant traits."""
-        self.traits[trait] += change
-        self.traits[trait] = max(0, min(100, self.traits[trait]))  # Clamp 0-100
-        
-        # Update dominant traits (traits with value >= 60)
-        self.dominant_traits = [trait for trait, value in self.traits.items() if value >= 60]
+        self._set_trait(trait, self._trait_values[TRAIT_INDEX[trait]] + change)
+    
+    @property
+    def dominant_traits(self) -> Tuple[Trait, ...]:
+        """Dominant traits in Trait order."""
+        return _TRAITS_BY_MASK[self.dominant_mask]
     
-    def get_dominant_traits(self) -> List[Trait]:
-        """Get list of dominant traits."""
-        return self.dominant_traits.copy()
+    def get_dominant_traits(self) -> Tuple[Trait, ...]:
+        """Get the dominant traits (a shared immutable tuple)."""
+        return _TRAITS_BY_MASK[self.dominant_mask]
     
-    def gain_experience(self, amount: int):
-        """Gain experience and handle leveling up."""
+    def has_dominant_traits(self, mask: int) -> bool:
+        """Check that every trait in a trait_mask() is dominant."""
+        return self.dominant_mask & mask == mask
+    
+    def has_any_dominant_trait(self, mask: int) -> bool:
+        """Check that at least one trait in a trait_mask() is dominant."""
+        return self.dominant_mask & mask != 0
+    
+    def gain_experience(self, amount: int, announce: bool = True) -> Dict[str, Any]:
+        """Gain experience and handle leveling up, however many levels it spans.
+        
+        Stats and techniques for every level gained are applied in one step, so
+        large grants (offline rewards, catch-up, simulation setup) cost the same
+        as a single level. Returns a summary of the level-up.
+        """
         self.experience += amount
         
-        # Check for level up (every 100 XP)
-        new_level = (self.experience // 100) + 1
-        if new_level > self.level:
-            old_level = self.level
+        old_level = self.level
+        new_level = self.level_for_experience(self.experience)
+        result = {
+            'old_level': old_level,
+            'new_level': max(old_level, new_level),
+            'hp_increase': 0,
+            'ce_increase': 0,
+            'new_techniques': []
+        }
+        
+        if new_level > old_level:
             self.level = new_level
-            self._level_up(old_level, new_level)
+            result.update(self._level_up(old_level, new_level, announce))
+        
+        return result
+    
+    @staticmethod
+    def level_for_experience(experience: int) -> int:
+        """Level reached with a total amount of experience."""
+        return experience // XP_PER_LEVEL + 1
+    
+    @classmethod
+    def at_level(cls, name: str, level: int) -> 'Player':
+        """Create a player that has already progressed to the given level."""
+        player = cls(name)
+        if level > 1:
+            player.gain_experience((level - 1) * XP_PER_LEVEL, announce=False)
+        return player
     
-    def _level_up(self, old_level: int, new_level: int):
-        """Handle level up bonuses."""
-        print(f"\n🎉 {self.name} leveled up! Level {old_level} → {new_level}")
+    def _level_up(self, old_level: int, new_level: int, announce: bool = True) -> Dict[str, Any]:
+        """Handle level up bonuses for every level between old_level and new_level."""
+        levels_gained = new_level - old_level
         
         # Increase stats
-        hp_increase = 20
-        ce_increase = 10
+        hp_increase = HP_PER_LEVEL * levels_gained
+        ce_increase = CE_PER_LEVEL * levels_gained
         
         self.max_hp += hp_increase
         self.max_cursed_energy += ce_increase
         self.hp = self.max_hp  # Full heal on level up
         self.cursed_energy = self.max_cursed_energy
         
-        print(f"HP increased by {hp_increase}! (Now: {self.max_hp})")
-        print(f"Cursed Energy increased by {ce_increase}! (Now: {self.max_cursed_energy})")
+        if announce:
+            print(f"\n🎉 {self.name} leveled up! Level {old_level} → {new_level}")
+            print(f"HP increased by {hp_increase}! (Now: {self.max_hp})")
+            print(f"Cursed Energy increased by {ce_increase}! (Now: {self.max_cursed_energy})")
         
         # Learn new techniques at certain levels
-        self._check_new_techniques()
+        new_techniques = self._learn_scheduled_techniques(announce)
+        
+        return {
+            'hp_increase': hp_increase,
+            'ce_increase': ce_increase,
+            'new_techniques': new_techniques
+        }
     
     def _check_new_techniques(self):
         """Check if new techniques should be unlocked at current level."""
-        new_techniques = []
-        
-        if self.level >= 3 and not any(t.name == "Shadow Clone" for t in self.techniques):
-            shadow_clone = CursedTechnique(
-                "Shadow Clone",
-                damage=35,
-                cost=25,
-                description="Create a shadow clone to attack the enemy.",
-                cooldown=2
-            )
-            new_techniques.append(shadow_clone)
-        
-        if self.level >= 5 and not any(t.name == "Cursed Energy Burst" for t in self.techniques):
-            burst = CursedTechnique(
-                "Cursed Energy Burst",
-                damage=50,
-                cost=35,
-                description="A powerful burst of cursed energy.",
-                cooldown=3
-            )
-            new_techniques.append(burst)
-        
-        if self.level >= 8 and not any(t.name == "Wukong Technique" for t in self.techniques):
-            wukong = CursedTechnique(
-                "Wukong Technique",
-                damage=60,
-                cost=40,
-                description="Original technique inspired by the Monkey King.",
-                cooldown=4
-            )
-            new_techniques.append(wukong)
+        self._learn_scheduled_techniques(announce=True)
+    
+    def _learn_scheduled_techniques(self, announce: bool) -> List[str]:
+        """Learn every technique on the level-up schedule up to the current level."""
+        from cursed_techniques import get_technique_library
+        library = get_technique_library()
+        learned = []
         
-        for technique in new_techniques:
+        for key in library.get_level_up_unlocks(self.level):
+            definition = library.get_definition(key)
+            if self.has_technique(definition.name):
+                continue
+            
+            technique = CursedTechnique.from_definition(definition)
             self.add_technique(technique)
-            print(f"🌟 New technique learned: {technique.name}!")
-            print(f"   {technique.description}")
+            learned.append(technique.name)
+            if announce:
+                print(f"🌟 New technique learned: {technique.name}!")
+                print(f"   {technique.description}")
+        
+        return learned
     
     def activate_transformation(self, transformation_name: str, duration: int):
         """Activate a transformation like Ultra Instinct Monkey."""
@@ -281,9 +474,9 @@ class Player(Character):
         base_chance = 0.15  # 15% base dodge chance
         
         # Trait bonuses
-        if Trait.FOCUSED in self.dominant_traits:
+        if self.dominant_mask & TRAIT_BIT[Trait.FOCUSED]:
             base_chance += 0.1
-        if Trait.CAUTIOUS in self.dominant_traits:
+        if self.dominant_mask & TRAIT_BIT[Trait.CAUTIOUS]:
             base_chance += 0.05
         
         # Transformation bonuses
@@ -303,22 +496,12 @@ class Player(Character):
             'level': self.level,
             'experience': self.experience,
             'traits': {trait.value: value for trait, value in self.traits.items()},
-            'relationships': self.relationships,
+            'relationships': dict(self.relationships),
             'transformation_active': self.transformation_active,
             'transformation_name': self.transformation_name,
             'transformation_turns': self.transformation_turns,
-            'techniques': [
-                {
-                    'name': t.name,
-                    'damage': t.damage,
-                    'cost': t.cost,
-                    'description': t.description,
-                    'technique_type': t.technique_type,
-                    'cooldown': t.cooldown,
-                    'current_cooldown': t.current_cooldown
-                }
-                for t in self.techniques
-            ]
+            # Catalog ids and cooldowns; definitions come from the catalog on load
+            'techniques': [t.to_dict() for t in self.techniques]
         }
     
     @classmethod
@@ -332,15 +515,11 @@ class Player(Character):
         player.level = data['level']
         player.experience = data['experience']
         
-        # Restore traits
-        player.traits = {}
-        for trait_name, value in data['traits'].items():
-            trait = next((t for t in Trait if t.value == trait_name), None)
-            if trait:
-                player.traits[trait] = value
-        
-        # Update dominant traits
-        player.dominant_traits = [trait for trait, value in player.traits.items() if value >= 60]
+        # Restore traits (dominant traits follow from the values)
+        traits_by_name = {trait.value: trait for trait in Trait}
+        player.traits = {traits_by_name[trait_name]: value
+                         for trait_name, value in data['traits'].items()
+                         if trait_name in traits_by_name}
         
         player.relationships = data['relationships']
         player.transformation_active = data['transformation_active']
@@ -348,18 +527,7 @@ class Player(Character):
         player.transformation_turns = data['transformation_turns']
         
         # Restore techniques
-        player.techniques = []
-        for tech_data in data['techniques']:
-            technique = CursedTechnique(
-                tech_data['name'],
-                tech_data['damage'],
-                tech_data['cost'],
-                tech_data['description'],
-                tech_data['technique_type'],
-                tech_data['cooldown']
-            )
-            technique.current_cooldown = tech_data['current_cooldown']
-            player.techniques.append(technique)
+        player.techniques = [CursedTechnique.from_dict(tech_data) for tech_data in data['techniques']]
         
         return player
 
@@ -367,6 +535,10 @@ class Player(Character):
 class Enemy(Character):
     """Enemy character with AI behavior patterns."""
     
+    __slots__ = ('difficulty', 'ai_pattern', 'phase', 'max_phases',
+                 'phase_transition_messages', 'enemy_type', 'base_max_hp',
+                 'base_max_cursed_energy')
+    
     def __init__(self, name: str, max_hp: int, max_cursed_energy: int, 
                  difficulty: str = "normal"):
         super().__init__(name, max_hp, max_cursed_energy)
@@ -374,20 +546,31 @@ class Enemy(Character):
         self.ai_pattern = "aggressive"  # aggressive, defensive, mixed
         self.phase = 1
         self.max_phases = 1
-        self.phase_transition_messages = []
+        self.phase_transition_messages = ()  # Set by the story for multi-phase bosses
+        self.enemy_type = None  # Template key when created from the enemy registry
+        self.base_max_hp = max_hp  # Unscaled stats that reset() scales from
+        self.base_max_cursed_energy = max_cursed_energy
         
         self._initialize_enemy_techniques()
     
+    def reset(self, level: int = 1, hp_bonus: int = 0, ce_bonus: int = 0) -> 'Enemy':
+        """Restore the enemy in place for a new fight at the given level and stat bonus."""
+        self.max_hp = self.base_max_hp + hp_bonus
+        self.hp = self.max_hp
+        self.max_cursed_energy = self.base_max_cursed_energy + ce_bonus
+        self.cursed_energy = self.max_cursed_energy
+        self.level = level
+        self.phase = 1
+        self.status_effects.clear()
+        for technique in self._techniques:
+            technique.current_cooldown = 0
+            technique.uses = 0
+        return self
+    
     def _initialize_enemy_techniques(self):
         """Initialize enemy with appropriate techniques."""
         # Basic enemy attack
-        basic_attack = CursedTechnique(
-            f"{self.name}'s Assault",
-            damage=20,
-            cost=5,
-            description=f"{self.name} launches a fierce attack."
-        )
-        self.add_technique(basic_attack)
+        self.add_technique(CursedTechnique.from_definition(_enemy_assault(self.name)))
     
     def choose_action(self, player) -> str:
         """AI chooses an action based on pattern and situation."""
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Chapter Checkpoints
+
+Jumps a fresh GameState and StoryManager straight to a chapter or story scene,
+for QA and testing. Checkpoints come from one scripted playthrough that always
+takes the first story choice, wins every fight and, where a scene is not
+written yet, resumes where a loaded save would. The playthrough's state on
+first reaching each chapter and scene is cached on disk, keyed by a hash of the
+story content and the data files it depends on, so loading a checkpoint is a
+single small file read and the cache rebuilds itself when the story changes.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+from typing import Any, Dict, Optional, Union
+
+from character import Player
+from cursed_techniques import TECHNIQUE_CATALOG_FILE
+from enemies import ENEMY_TEMPLATE_FILE
+from game_state import GameState
+from save_format import SAVE_FORMAT_VERSION, normalize_state, write_atomic
+from simulation import quiet, release_enemy
+from story import DIFFICULTY_TABLE_FILE, StoryManager
+from story_graph import get_story_graph
+
+
+CHECKPOINT_DIRECTORY = "checkpoints"
+CHECKPOINT_VERSION = 1
+MAX_CHECKPOINT_CHAPTER = 15
+CHECKPOINT_PLAYER_NAME = "Checkpoint Sorcerer"
+CHECKPOINT_SEED = 0
+_MAX_PLAYTHROUGH_STEPS = 1000
+
+# Data files the playthrough's outcome depends on besides the scenes themselves
+_CONTENT_FILES = (TECHNIQUE_CATALOG_FILE, ENEMY_TEMPLATE_FILE, DIFFICULTY_TABLE_FILE)
+
+# Story hash -> checkpoints, for this process
+_checkpoints: Dict[str, Dict[str, Dict[str, Any]]] = {}
+_checkpoints_lock = threading.Lock()
+
+
+def story_content_hash(story_manager: Optional[StoryManager] = None) -> str:
+    """SHA-256 of the story content and the data files a playthrough depends on."""
+    graph = story_manager.graph if story_manager is not None else get_story_graph()
+    digest = hashlib.sha256(f"{CHECKPOINT_VERSION}:{SAVE_FORMAT_VERSION}:".encode("utf-8"))
+    # Hash of the chapter files, kept with the compiled graph so no scene text is read
+    digest.update(graph.content_hash.encode("ascii"))
+    for path in _CONTENT_FILES:
+        try:
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        except OSError:
+            digest.update(b"missing")
+    return digest.hexdigest()
+
+
+def _win_fight(player: Player, enemy):
+    """Resolve a scripted fight as a win with the usual reward, then rest."""
+    player.gain_experience(enemy.level * 25 + enemy.max_hp // 5)
+    release_enemy(enemy)
+    player.hp = player.max_hp
+    player.cursed_energy = player.max_cursed_energy
+
+
+def record_playthrough(max_chapter: int = MAX_CHECKPOINT_CHAPTER) -> Dict[str, Dict[str, Any]]:
+    """Play the canonical route and return its checkpoints by "chapter:N" and "scene:NAME"."""
+    rng_state = random.getstate()
+    random.seed(CHECKPOINT_SEED)
+    try:
+        game_state = GameState()
+        story = StoryManager()
+        game_state.set_player(Player(CHECKPOINT_PLAYER_NAME))
+        checkpoints: Dict[str, Dict[str, Any]] = {}
+
+        with quiet():
+            story.start_story(game_state)
+            for _ in range(_MAX_PLAYTHROUGH_STEPS):
+                if story.current_scene not in story.story_scenes:
+                    # Not written yet: continue where a loaded save would
+                    story.load_story_state(game_state)
+                    if story.current_scene not in story.story_scenes:
+                        break
+                if game_state.current_chapter > max_chapter:
+                    break
+
+                checkpoint = None
+                for key in (f"chapter:{game_state.current_chapter}", f"scene:{story.current_scene}"):
+                    if key not in checkpoints:
+                        checkpoint = checkpoint or {"scene": story.current_scene,
+                                                    "state": normalize_state(game_state.to_save_state())}
+                        checkpoints[key] = checkpoint
+
+                if not story.get_available_actions(game_state):
+                    break
+                result = story.process_action(0, game_state)
+                if result.get("combat"):
+                    _win_fight(game_state.player, result["enemy"])
+    finally:
+        random.setstate(rng_state)
+    return checkpoints
+
+
+def _checkpoint_path(directory: str, story_hash: str) -> str:
+    return os.path.join(directory, f"checkpoints_{story_hash[:16]}.json")
+
+
+def _read_checkpoints(path: str, story_hash: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("story_hash") != story_hash:
+        return None
+    return data.get("checkpoints")
+
+
+def _write_checkpoints(directory: str, story_hash: str, checkpoints: Dict[str, Dict[str, Any]]):
+    """Cache checkpoints on disk and remove caches for older story content."""
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = _checkpoint_path(directory, story_hash)
+        data = json.dumps({"version": CHECKPOINT_VERSION, "story_hash": story_hash,
+                           "checkpoints": checkpoints}, separators=(",", ":"))
+        write_atomic(path, data.encode("utf-8"))
+        for entry in os.scandir(directory):
+            if entry.name.startswith("checkpoints_") and entry.path != path:
+                os.remove(entry.path)
+    except OSError:
+        pass  # Read-only install: play through again next time
+
+
+def load_checkpoints(story_manager: Optional[StoryManager] = None,
+                     directory: str = CHECKPOINT_DIRECTORY,
+                     rebuild: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Get the checkpoints for the current story content, playing through once if not cached."""
+    story_hash = story_content_hash(story_manager)
+    with _checkpoints_lock:
+        checkpoints = None if rebuild else _checkpoints.get(story_hash)
+        if checkpoints is None and not rebuild:
+            checkpoints = _read_checkpoints(_checkpoint_path(directory, story_hash), story_hash)
+        if checkpoints is None:
+            checkpoints = record_playthrough()
+            _write_checkpoints(directory, story_hash, checkpoints)
+        _checkpoints[story_hash] = checkpoints
+    return checkpoints
+
+
+def fast_forward(game_state: GameState, story_manager: StoryManager, target: Union[int, str],
+                 directory: str = CHECKPOINT_DIRECTORY) -> bool:
+    """Jump to a chapter number or scene name. Returns False if the playthrough never got there."""
+    key = f"chapter:{target}" if isinstance(target, int) else f"scene:{target}"
+    checkpoint = load_checkpoints(story_manager, directory).get(key)
+    if checkpoint is None:
+        return False
+
+    # The cached state is shared by every jump in this process
+    game_state.restore_save_state(normalize_state(checkpoint["state"]))
+    story_manager.current_scene = checkpoint["scene"]
+    return True
+
+
+def main():
+    """List the checkpoints for the current story, rebuilding them if asked."""
+    parser = argparse.ArgumentParser(description="Story checkpoints for QA")
+    parser.add_argument("--rebuild", action="store_true", help="replay the canonical route")
+    parser.add_argument("--directory", default=CHECKPOINT_DIRECTORY)
+    args = parser.parse_args()
+
+    checkpoints = load_checkpoints(directory=args.directory, rebuild=args.rebuild)
+    for key, checkpoint in checkpoints.items():
+        state = checkpoint["state"]
+        level = state["player_data"]["level"] if state["player_data"] else 1
+        print(f"{key:<40} scene {checkpoint['scene']:<30} chapter {state['current_chapter']:>3}  "
+              f"level {level}")
+
+
+if __name__ == "__main__":
+    main()
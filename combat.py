@@ -234,7 +234,7 @@ class CombatSystem:
         
         # Check for dodge
         if technique.technique_type == "offensive" and self.check_dodge(user, target, is_enemy):
-            technique.current_cooldown = technique.cooldown  # Still goes on cooldown
+            technique.start_cooldown()  # Still goes on cooldown
             return
         
         # Execute technique
@@ -248,7 +248,7 @@ class CombatSystem:
             print(f"{user.name} uses {technique.name} to enhance their defenses!")
         
         # Apply cooldown
-        technique.current_cooldown = technique.cooldown
+        technique.start_cooldown()
         
         # Special technique effects
         self.apply_technique_effects(user, target, technique)
@@ -5,319 +5,210 @@ Defines canon and original cursed techniques from the Jujutsu Kaisen universe,
 including their effects, requirements, and progression.
 """
 
-from typing import Dict, List, Any, Optional
-from character import CursedTechnique
+from typing import Dict, FrozenSet, Iterable, List, Any, NamedTuple, Optional, Tuple
+from bisect import bisect_right
+import hashlib
+import json
+import marshal
+import os
+import threading
+from character import CursedTechnique, TechniqueDefinition, Trait
 import random
 
 
+# Technique catalog authored by designers, and its compiled cache
+TECHNIQUE_CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                      "techniques.json")
+CATALOG_CACHE_VERSION = 2
+
+
+class CatalogEntry(NamedTuple):
+    """A compiled technique catalog record."""
+    key: str
+    definition: TechniqueDefinition
+    unlock_level: int
+    traits: Tuple[str, ...]  # Trait values, e.g. "Focused"
+    learned_at_level: int  # Level at which players learn it automatically, 0 if never
+
+
+def _compile_catalog(source: bytes) -> List[tuple]:
+    """Parse and validate catalog JSON into plain tuples for the binary cache."""
+    catalog = json.loads(source.decode("utf-8"))
+    records = []
+    trait_values = {trait.value for trait in Trait}
+    
+    for key, data in catalog["techniques"].items():
+        traits = tuple(data.get("traits", ()))
+        unknown = [t for t in traits if t not in trait_values]
+        if unknown:
+            raise ValueError(f"Technique {key} has unknown traits: {unknown}")
+        
+        records.append((
+            key,
+            data["name"],
+            int(data["damage"]),
+            int(data["cost"]),
+            data["description"],
+            data.get("technique_type", "offensive"),
+            int(data.get("cooldown", 0)),
+            int(data.get("unlock_level", 1)),
+            traits,
+            int(data.get("learned_at_level", 0))
+        ))
+    
+    return records
+
+
+def _read_catalog_cache(cache_path: str) -> Optional[tuple]:
+    """Read the compiled cache in one go: (mtime_ns, size, sha256, records) or None."""
+    try:
+        with open(cache_path, "rb") as f:
+            version, mtime_ns, size, digest, records = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    
+    if version != CATALOG_CACHE_VERSION:
+        return None
+    return mtime_ns, size, digest, records
+
+
+def load_technique_catalog(path: str = TECHNIQUE_CATALOG_FILE) -> List[CatalogEntry]:
+    """Load the technique catalog, using the compiled cache when it is current.
+    
+    The cache is keyed by the catalog's mtime and size, falling back to its
+    SHA-256 when the timestamp changed, so an untouched catalog costs a stat()
+    and a single read of the cache file however many techniques it holds.
+    """
+    cache_path = path + ".cache"
+    stat = os.stat(path)
+    cache = _read_catalog_cache(cache_path)
+    
+    if cache and cache[0] == stat.st_mtime_ns and cache[1] == stat.st_size:
+        records = cache[3]
+    else:
+        with open(path, "rb") as f:
+            source = f.read()
+        digest = hashlib.sha256(source).hexdigest()
+        
+        if cache and cache[2] == digest:
+            records = cache[3]  # Touched but unchanged
+        else:
+            records = _compile_catalog(source)
+        
+        try:
+            with open(cache_path, "wb") as f:
+                f.write(marshal.dumps((CATALOG_CACHE_VERSION, stat.st_mtime_ns, stat.st_size,
+                                       digest, records)))
+        except OSError:
+            pass  # Read-only install: compile again next time
+    
+    return [
+        CatalogEntry(key, TechniqueDefinition(name, damage, cost, description,
+                                              technique_type, cooldown),
+                     unlock_level, tuple(traits), learned_at_level)
+        for (key, name, damage, cost, description, technique_type, cooldown, unlock_level, traits,
+             learned_at_level) in records
+    ]
+
+
 class TechniqueLibrary:
     """Library of all available cursed techniques in the game."""
     
-    def __init__(self):
-        self.techniques = {}
+    def __init__(self, catalog_file: str = TECHNIQUE_CATALOG_FILE):
+        self.catalog_file = catalog_file
+        self.techniques: Dict[str, TechniqueDefinition] = {}
+        self.unlock_levels: Dict[str, int] = {}
+        self.technique_traits: Dict[str, Tuple[str, ...]] = {}
+        self.learned_at_levels: Dict[str, int] = {}
         self._initialize_techniques()
+        self._build_indexes()
     
     def _initialize_techniques(self):
-        """Initialize all cursed techniques."""
-        # Basic Techniques (Available early)
-        self.techniques["cursed_energy_strike"] = CursedTechnique(
-            "Cursed Energy Strike",
-            damage=25,
-            cost=10,
-            description="A basic attack enhanced with cursed energy.",
-            technique_type="offensive"
-        )
-        
-        self.techniques["cursed_energy_guard"] = CursedTechnique(
-            "Cursed Energy Guard",
-            damage=0,
-            cost=15,
-            description="Defensive technique that reduces incoming damage.",
-            technique_type="defensive"
-        )
-        
-        # Canon JJK Techniques
-        
-        # Yuji-inspired techniques
-        self.techniques["black_flash"] = CursedTechnique(
-            "Black Flash",
-            damage=80,
-            cost=30,
-            description="A critical hit with cursed energy applied within 0.000001 seconds of impact.",
-            technique_type="offensive",
-            cooldown=5
-        )
-        
-        self.techniques["divergent_fist"] = CursedTechnique(
-            "Divergent Fist",
-            damage=35,
-            cost=15,
-            description="A delayed cursed energy impact that follows the physical blow.",
-            technique_type="offensive",
-            cooldown=2
-        )
-        
-        # Gojo-inspired techniques
-        self.techniques["limitless_blue"] = CursedTechnique(
-            "Limitless: Blue",
-            damage=60,
-            cost=40,
-            description="Creates an attractive force that pulls and damages enemies.",
-            technique_type="offensive",
-            cooldown=4
-        )
-        
-        self.techniques["limitless_red"] = CursedTechnique(
-            "Limitless: Red",
-            damage=75,
-            cost=50,
-            description="Creates a repulsive force that pushes and damages enemies.",
-            technique_type="offensive",
-            cooldown=5
-        )
-        
-        # Megumi-inspired techniques
-        self.techniques["divine_dogs"] = CursedTechnique(
-            "Divine Dogs",
-            damage=40,
-            cost=25,
-            description="Summon divine dogs to attack the enemy.",
-            technique_type="offensive",
-            cooldown=3
-        )
-        
-        self.techniques["shadow_clone"] = CursedTechnique(
-            "Shadow Clone",
-            damage=35,
-            cost=25,
-            description="Create a shadow clone to attack the enemy.",
-            technique_type="offensive",
-            cooldown=2
-        )
-        
-        # Nobara-inspired techniques
-        self.techniques["straw_doll"] = CursedTechnique(
-            "Straw Doll Technique",
-            damage=45,
-            cost=30,
-            description="Use cursed energy to damage enemies through connection.",
-            technique_type="offensive",
-            cooldown=3
-        )
-        
-        # Maki-inspired techniques
-        self.techniques["weapon_mastery"] = CursedTechnique(
-            "Weapon Mastery",
-            damage=50,
-            cost=20,
-            description="Enhanced weapon techniques with superior skill.",
-            technique_type="offensive",
-            cooldown=2
-        )
-        
-        # Inumaki-inspired techniques
-        self.techniques["cursed_speech"] = CursedTechnique(
-            "Cursed Speech: Stop",
-            damage=0,
-            cost=35,
-            description="Force the enemy to stop moving for one turn.",
-            technique_type="utility",
-            cooldown=4
-        )
-        
-        # Todo-inspired techniques
-        self.techniques["boogie_woogie"] = CursedTechnique(
-            "Boogie Woogie",
-            damage=0,
-            cost=25,
-            description="Switch positions to confuse the enemy and set up attacks.",
-            technique_type="utility",
-            cooldown=3
-        )
-        
-        # Original Techniques
-        
-        # Wukong-inspired techniques (Original)
-        self.techniques["wukong_technique"] = CursedTechnique(
-            "Wukong Technique",
-            damage=60,
-            cost=40,
-            description="Original technique inspired by the Monkey King's agility and strength.",
-            technique_type="offensive",
-            cooldown=4
-        )
-        
-        self.techniques["monkey_king_staff"] = CursedTechnique(
-            "Monkey King's Staff",
-            damage=55,
-            cost=35,
-            description="Manifest a powerful staff with extending reach and devastating power.",
-            technique_type="offensive",
-            cooldown=3
-        )
-        
-        self.techniques["seventy_two_transformations"] = CursedTechnique(
-            "Seventy-Two Transformations",
-            damage=0,
-            cost=45,
-            description="Change form to adapt to different combat situations.",
-            technique_type="utility",
-            cooldown=6
-        )
-        
-        self.techniques["cloud_somersault"] = CursedTechnique(
-            "Cloud Somersault",
-            damage=30,
-            cost=20,
-            description="Swift movement technique that can evade and strike simultaneously.",
-            technique_type="offensive",
-            cooldown=2
-        )
-        
-        # Ultra Instinct Monkey techniques
-        self.techniques["ultra_instinct_strike"] = CursedTechnique(
-            "Ultra Instinct Strike",
-            damage=90,
-            cost=50,
-            description="A perfectly timed strike that bypasses most defenses.",
-            technique_type="offensive",
-            cooldown=6
-        )
-        
-        self.techniques["autonomous_counter"] = CursedTechnique(
-            "Autonomous Counter",
-            damage=70,
-            cost=40,
-            description="Body moves automatically to counter any attack.",
-            technique_type="defensive",
-            cooldown=5
-        )
-        
-        # Advanced original techniques
-        self.techniques["cursed_energy_burst"] = CursedTechnique(
-            "Cursed Energy Burst",
-            damage=50,
-            cost=35,
-            description="A powerful burst of raw cursed energy.",
-            technique_type="offensive",
-            cooldown=3
-        )
-        
-        self.techniques["energy_drain"] = CursedTechnique(
-            "Energy Drain",
-            damage=25,
-            cost=20,
-            description="Drain the enemy's cursed energy while dealing damage.",
-            technique_type="offensive",
-            cooldown=4
-        )
-        
-        self.techniques["barrier_technique"] = CursedTechnique(
-            "Barrier Technique",
-            damage=0,
-            cost=30,
-            description="Create a protective barrier that reduces damage for several turns.",
-            technique_type="defensive",
-            cooldown=5
-        )
-        
-        # Domain Expansion techniques (Late game)
-        self.techniques["infinite_void"] = CursedTechnique(
-            "Domain Expansion: Infinite Void",
-            damage=100,
-            cost=80,
-            description="Create a domain where enemies are overwhelmed with infinite information.",
-            technique_type="offensive",
-            cooldown=10
-        )
-        
-        self.techniques["malevolent_shrine"] = CursedTechnique(
-            "Domain Expansion: Malevolent Shrine",
-            damage=120,
-            cost=90,
-            description="Create a domain of slashing attacks that cannot be avoided.",
-            technique_type="offensive",
-            cooldown=12
-        )
+        """Load all cursed techniques from the catalog."""
+        for entry in load_technique_catalog(self.catalog_file):
+            self.techniques[entry.key] = entry.definition
+            self.unlock_levels[entry.key] = entry.unlock_level
+            self.technique_traits[entry.key] = entry.traits
+            if entry.learned_at_level:
+                self.learned_at_levels[entry.key] = entry.learned_at_level
     
-    def get_technique(self, technique_name: str) -> Optional[CursedTechnique]:
-        """Get a technique by name."""
-        if technique_name in self.techniques:
-            # Return a copy to avoid modifying the original
-            original = self.techniques[technique_name]
-            return CursedTechnique(
-                original.name,
-                original.damage,
-                original.cost,
-                original.description,
-                original.technique_type,
-                original.cooldown
-            )
+    def get_definition(self, technique_name: str) -> Optional[TechniqueDefinition]:
+        """Get the shared, immutable definition of a technique by name."""
+        return self.techniques.get(technique_name)
+    
+    def get_key(self, definition: TechniqueDefinition) -> Optional[str]:
+        """Get the catalog key of a definition, or None if the catalog has no such technique."""
+        key = self._key_by_name.get(definition.name)
+        if key is not None and (self.techniques[key] is definition or self.techniques[key] == definition):
+            return key
         return None
     
-    def get_techniques_by_level(self, level: int) -> List[str]:
+    def get_key_by_name(self, display_name: str) -> Optional[str]:
+        """Get the catalog key of a technique by its display name, or None if there is none."""
+        return self._key_by_name.get(display_name)
+    
+    def get_technique(self, technique_name: str) -> Optional[CursedTechnique]:
+        """Get a technique by name, with fresh per-owner cooldown state."""
+        definition = self.techniques.get(technique_name)
+        if definition is None:
+            return None
+        return CursedTechnique.from_definition(definition)
+    
+    def _build_indexes(self):
+        """Precompute the level unlock table and trait index used by queries."""
+        # Sorted unlock levels, with the cumulative unlocks after each entry
+        self._unlock_levels: List[int] = []
+        self._unlocked_by_level: List[Tuple[str, ...]] = [()]
+        self._unlocked_sets: List[FrozenSet[str]] = [frozenset()]
+        level_unlocks = sorted(self.unlock_levels.items(), key=lambda item: item[1])
+        unlocked: List[str] = []
+        for technique_name, level in level_unlocks:
+            unlocked.append(technique_name)
+            self._unlock_levels.append(level)
+            self._unlocked_by_level.append(tuple(unlocked))
+            self._unlocked_sets.append(frozenset(unlocked))
+        
+        # Level-up schedule: techniques players learn automatically, by level
+        schedule = sorted(self.learned_at_levels.items(), key=lambda item: item[1])
+        self._schedule_levels = [level for _, level in schedule]
+        self._schedule_keys = tuple(key for key, _ in schedule)
+        
+        self._trait_index: Dict[Trait, Tuple[str, ...]] = {
+            trait: tuple(key for key, traits in self.technique_traits.items() if trait.value in traits)
+            for trait in Trait
+        }
+        self._trait_cache: Dict[Tuple[Trait, ...], Tuple[str, ...]] = {}
+        self._key_by_name = {definition.name: key for key, definition in self.techniques.items()}
+    
+    def get_techniques_by_level(self, level: int) -> Tuple[str, ...]:
         """Get technique names available at a specific level."""
-        available = []
-        
-        # Level-based availability
-        if level >= 1:
-            available.extend(["cursed_energy_strike", "cursed_energy_guard"])
-        
-        if level >= 3:
-            available.extend(["shadow_clone", "divergent_fist"])
-        
-        if level >= 5:
-            available.extend(["cursed_energy_burst", "divine_dogs"])
-        
-        if level >= 7:
-            available.extend(["wukong_technique", "straw_doll"])
-        
-        if level >= 10:
-            available.extend(["black_flash", "weapon_mastery", "monkey_king_staff"])
-        
-        if level >= 12:
-            available.extend(["limitless_blue", "boogie_woogie", "cloud_somersault"])
-        
-        if level >= 15:
-            available.extend(["limitless_red", "cursed_speech", "energy_drain"])
-        
-        if level >= 18:
-            available.extend(["ultra_instinct_strike", "seventy_two_transformations"])
-        
-        if level >= 20:
-            available.extend(["autonomous_counter", "barrier_technique"])
-        
-        if level >= 25:
-            available.extend(["infinite_void"])
-        
-        if level >= 30:
-            available.extend(["malevolent_shrine"])
-        
-        return available
+        return self._unlocked_by_level[bisect_right(self._unlock_levels, level)]
     
-    def get_techniques_by_trait(self, dominant_traits: List) -> List[str]:
+    def get_level_up_unlocks(self, level: int, from_level: int = 0) -> Tuple[str, ...]:
+        """Get techniques learned automatically above from_level up to and including level."""
+        start = bisect_right(self._schedule_levels, from_level)
+        end = bisect_right(self._schedule_levels, level)
+        return self._schedule_keys[start:end]
+    
+    def get_techniques_by_trait(self, dominant_traits: List[Trait]) -> Tuple[str, ...]:
         """Get techniques that match character traits."""
-        trait_techniques = []
-        
-        for trait in dominant_traits:
-            if trait.value == "Compassionate":
-                trait_techniques.extend(["barrier_technique", "cursed_energy_guard"])
-            elif trait.value == "Focused":
-                trait_techniques.extend(["black_flash", "ultra_instinct_strike"])
-            elif trait.value == "Aggressive":
-                trait_techniques.extend(["cursed_energy_burst", "malevolent_shrine"])
-            elif trait.value == "Protective":
-                trait_techniques.extend(["divine_dogs", "barrier_technique"])
-            elif trait.value == "Analytical":
-                trait_techniques.extend(["boogie_woogie", "seventy_two_transformations"])
-            elif trait.value == "Reckless":
-                trait_techniques.extend(["divergent_fist", "limitless_red"])
-            elif trait.value == "Determined":
-                trait_techniques.extend(["wukong_technique", "autonomous_counter"])
-            elif trait.value == "Cautious":
-                trait_techniques.extend(["shadow_clone", "cursed_speech"])
-        
-        return trait_techniques
+        key = tuple(dominant_traits)
+        cached = self._trait_cache.get(key)
+        if cached is None:
+            names = (name for trait in key for name in self._trait_index.get(trait, ()))
+            cached = self._trait_cache[key] = tuple(dict.fromkeys(names))
+        return cached
+    
+    def get_eligible_techniques(self, level: int, dominant_traits: List[Trait],
+                                owned: Iterable[str] = ()) -> Tuple[str, ...]:
+        """Get techniques unlocked by both level and traits that are not yet owned.
+        
+        Owned techniques may be given by library key or by display name.
+        """
+        level_set = self._unlocked_sets[bisect_right(self._unlock_levels, level)]
+        eligible = level_set.intersection(self.get_techniques_by_trait(dominant_traits))
+        eligible -= {self._key_by_name.get(name, name) for name in owned}
+        return tuple(name for name in self.get_techniques_by_level(level) if name in eligible)
 
 
 class TechniqueEffects:
@@ -415,6 +306,24 @@ class TechniqueEffects:
             print(f"⛩️ {target.name} is marked by the malevolent shrine!")
 
 
+_technique_library: Optional[TechniqueLibrary] = None
+_technique_library_lock = threading.Lock()
+
+
 def get_technique_library() -> TechniqueLibrary:
-    """Get the global technique library instance."""
-    return TechniqueLibrary()
\ No newline at end of file
+    """Get the global technique library instance, creating it on first use."""
+    global _technique_library
+    library = _technique_library
+    if library is None:
+        with _technique_library_lock:
+            if _technique_library is None:
+                _technique_library = TechniqueLibrary()
+            library = _technique_library
+    return library
+
+
+def reset_technique_library():
+    """Discard the global technique library so the next call rebuilds it (for tests)."""
+    global _technique_library
+    with _technique_library_lock:
+        _technique_library = None
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Distributed Simulation Runner
+
+Coordinator/worker mode for very large balance sweeps. The coordinator shards
+batches of simulated matchups over TCP to worker processes, which may run on
+other machines or as several local processes. Results stream back as they
+finish, and a batch held by a worker that disconnects, stops answering or
+fails to simulate it is put back on the queue for another worker. A batch that
+fails MAX_BATCH_ATTEMPTS times, or a run that finishes no batch for
+PROGRESS_TIMEOUT seconds, raises instead of waiting forever for a result that
+will never come; a run that keeps making progress may take as long as it needs.
+
+Messages are length-prefixed JSON objects:
+    coordinator -> worker: {"type": "batch", "id": n, "tasks": [[build, enemy_type, level, fights, seed], ...]}
+    worker -> coordinator: {"type": "result", "id": n, "win_rates": [...]}
+    worker -> coordinator: {"type": "error", "id": n, "error": "..."}
+    coordinator -> worker: {"type": "shutdown"}
+"""
+
+import argparse
+import json
+import multiprocessing
+import queue
+import socket
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from simulation import PLAYER_BUILDS, ENEMY_TYPES, MAX_LEVEL, simulate_matchup
+
+
+_HEADER = struct.Struct("!I")
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+MAX_BATCH_ATTEMPTS = 3  # Failed attempts before a batch fails the whole run
+PROGRESS_TIMEOUT = 3600.0  # Seconds a coordinator run may go without finishing a batch
+
+
+class DistributedRunError(RuntimeError):
+    """A batch failed on every attempt, so the run cannot complete."""
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any]):
+    """Send one length-prefixed JSON message."""
+    payload = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Read exactly size bytes, or None if the connection closes first."""
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """Receive one length-prefixed JSON message, or None if the peer closed."""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError(f"Message too large: {size} bytes")
+    payload = _recv_exact(sock, size)
+    if payload is None:
+        return None
+    return json.loads(payload.decode("utf-8"))
+
+
+def make_batches(tasks: List[Tuple[str, str, int, int, int]], batch_size: int = 8) -> List[Dict[str, Any]]:
+    """Split matchup tasks into numbered batches."""
+    return [
+        {"id": i, "tasks": [list(task) for task in tasks[start:start + batch_size]]}
+        for i, start in enumerate(range(0, len(tasks), batch_size))
+    ]
+
+
+def run_batch(tasks: List[List[Any]]) -> List[float]:
+    """Simulate every matchup in a batch."""
+    return [simulate_matchup(build, enemy_type, level, fights, seed)
+            for build, enemy_type, level, fights, seed in tasks]
+
+
+class Coordinator:
+    """Hands out batches to connected workers and collects their results."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 batch_timeout: float = 300.0, max_attempts: int = MAX_BATCH_ATTEMPTS):
+        self.batch_timeout = batch_timeout
+        self.max_attempts = max_attempts
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen()
+        self.server.settimeout(0.2)
+        self.pending: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self.results: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self.finished = threading.Event()
+        self.retries = 0
+        self._failures: Dict[int, List[str]] = {}  # Batch id -> why each attempt failed
+        self._failures_lock = threading.Lock()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Host and port workers should connect to."""
+        return self.server.getsockname()
+
+    def _accept_workers(self):
+        """Accept worker connections until the run finishes."""
+        while not self.finished.is_set():
+            try:
+                conn, _ = self.server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            threading.Thread(target=self._serve_worker, args=(conn,), daemon=True).start()
+
+    def _batch_failed(self, batch: Dict[str, Any], reason: str):
+        """Requeue a failed batch, or fail the run once it has used up its attempts."""
+        with self._failures_lock:
+            failures = self._failures.setdefault(batch["id"], [])
+            failures.append(reason)
+            attempts = len(failures)
+            if attempts < self.max_attempts:
+                self.retries += 1
+        if attempts >= self.max_attempts:
+            self.results.put({"type": "failed", "id": batch["id"], "errors": failures})
+        else:
+            self.pending.put(batch)
+
+    def _serve_worker(self, conn: socket.socket):
+        """Feed one worker batches until the run finishes or the worker is lost."""
+        conn.settimeout(self.batch_timeout)
+        with conn:
+            while not self.finished.is_set():
+                try:
+                    batch = self.pending.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
+                try:
+                    send_message(conn, {"type": "batch", **batch})
+                    reply = recv_message(conn)
+                    if reply is None:
+                        raise ConnectionError("worker lost")
+                    if reply.get("id") != batch["id"]:
+                        raise ValueError(f"reply for batch {reply.get('id')} instead of {batch['id']}")
+                    if reply.get("type") == "error":
+                        # The worker is fine but could not simulate this batch
+                        self._batch_failed(batch, str(reply.get("error")))
+                        continue
+                    win_rates = reply.get("win_rates")
+                    if (reply.get("type") != "result" or not isinstance(win_rates, list)
+                            or len(win_rates) != len(batch["tasks"])):
+                        raise ValueError(f"malformed result for batch {batch['id']}")
+                except (OSError, ValueError) as e:
+                    # Worker died, hung or sent garbage: give the batch to someone else
+                    self._batch_failed(batch, f"{type(e).__name__}: {e}")
+                    return
+
+                self.results.put(reply)
+
+            try:
+                send_message(conn, {"type": "shutdown"})
+            except OSError:
+                pass
+
+    def run(self, batches: List[Dict[str, Any]],
+            timeout: Optional[float] = PROGRESS_TIMEOUT) -> Iterator[Dict[str, Any]]:
+        """Distribute batches and yield each batch result as it arrives.
+
+        Raises DistributedRunError if a batch fails on every attempt, and
+        TimeoutError if no new batch finishes for timeout seconds.
+        """
+        for batch in batches:
+            self.pending.put(batch)
+
+        acceptor = threading.Thread(target=self._accept_workers, daemon=True)
+        acceptor.start()
+
+        done = set()
+        try:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while len(done) < len(batches):
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    result = self.results.get(timeout=remaining)
+                except queue.Empty:
+                    raise TimeoutError(f"Distributed run made no progress for {timeout}s with "
+                                       f"{len(batches) - len(done)} of {len(batches)} batches unfinished")
+                if result["id"] in done:
+                    continue  # Duplicate from a retried batch
+                if result["type"] == "failed":
+                    raise DistributedRunError(f"Batch {result['id']} failed {len(result['errors'])} times: "
+                                              + "; ".join(result["errors"]))
+                done.add(result["id"])
+                yield result
+                # Progress: the clock restarts for the next batch
+                deadline = None if timeout is None else time.monotonic() + timeout
+        finally:
+            self.finished.set()
+            acceptor.join()
+
+    def close(self):
+        """Stop accepting workers."""
+        self.finished.set()
+        self.server.close()
+
+
+def run_worker(host: str, port: int, connect_timeout: float = 30.0):
+    """Connect to a coordinator and process batches until told to stop."""
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            sock = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+    with sock:
+        while True:
+            message = recv_message(sock)
+            if message is None or message.get("type") == "shutdown":
+                return
+            try:
+                win_rates = run_batch(message["tasks"])
+            except Exception as e:
+                # Report the failure and stay available for other batches
+                send_message(sock, {"type": "error", "id": message["id"],
+                                    "error": f"{type(e).__name__}: {e}"})
+                continue
+            send_message(sock, {"type": "result", "id": message["id"], "win_rates": win_rates})
+
+
+def spawn_local_workers(address: Tuple[str, int], count: int) -> List[multiprocessing.Process]:
+    """Start worker processes on this machine connected to a coordinator."""
+    workers = []
+    for _ in range(count):
+        process = multiprocessing.Process(target=run_worker, args=address, daemon=True)
+        process.start()
+        workers.append(process)
+    return workers
+
+
+def run_distributed_sweep(tasks: List[Tuple[str, str, int, int, int]], batch_size: int = 8,
+                          host: str = "127.0.0.1", port: int = 0,
+                          local_workers: int = 0,
+                          timeout: Optional[float] = PROGRESS_TIMEOUT) -> Dict[Tuple[str, str, int], float]:
+    """Run matchup tasks through a coordinator and return win rates keyed by matchup."""
+    batches = make_batches(tasks, batch_size)
+    coordinator = Coordinator(host, port)
+    workers = spawn_local_workers(coordinator.address, local_workers)
+
+    win_rates = {}
+    try:
+        for result in coordinator.run(batches, timeout):
+            batch = batches[result["id"]]
+            for (build, enemy_type, level, _, _), rate in zip(batch["tasks"], result["win_rates"]):
+                win_rates[(build, enemy_type, level)] = rate
+    finally:
+        coordinator.close()
+        for process in workers:
+            process.join(timeout=5)
+
+    return win_rates
+
+
+def main():
+    """Run as a coordinator for the full tournament sweep, or as a worker."""
+    parser = argparse.ArgumentParser(description="Distributed combat simulation")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+
+    coordinator_parser = subparsers.add_parser("coordinator")
+    coordinator_parser.add_argument("--host", default="0.0.0.0")
+    coordinator_parser.add_argument("--port", type=int, default=7878)
+    coordinator_parser.add_argument("--fights", type=int, default=50)
+    coordinator_parser.add_argument("--batch-size", type=int, default=8)
+    coordinator_parser.add_argument("--local-workers", type=int, default=0)
+    coordinator_parser.add_argument("--timeout", type=float, default=PROGRESS_TIMEOUT,
+                                    help="seconds without a finished batch before the run fails")
+
+    worker_parser = subparsers.add_parser("worker")
+    worker_parser.add_argument("host")
+    worker_parser.add_argument("port", type=int)
+
+    args = parser.parse_args()
+
+    if args.mode == "worker":
+        run_worker(args.host, args.port)
+        return
+
+    tasks = [(build, enemy_type, level, args.fights, 0)
+             for build in PLAYER_BUILDS
+             for enemy_type in ENEMY_TYPES
+             for level in range(1, MAX_LEVEL + 1)]
+    print(f"Coordinating {len(tasks)} matchups on {args.host}:{args.port}...")
+    win_rates = run_distributed_sweep(tasks, args.batch_size, args.host, args.port,
+                                      args.local_workers, args.timeout)
+    for (build, enemy_type, level), rate in sorted(win_rates.items()):
+        print(f"{build},{enemy_type},{level},{rate:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Enemy Templates and Pooling
+
+Enemy types are declared as data in enemies.json and looked up by key, so a new
+enemy type needs no code. Enemies are handed out by a pool that recycles
+finished instances with Enemy.reset instead of allocating new ones, which keeps
+grinding loops and mass simulations free of allocation churn.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import json
+import os
+import threading
+from character import Enemy
+
+
+ENEMY_TEMPLATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "enemies.json")
+AI_PATTERNS = ("aggressive", "defensive", "mixed")
+
+
+class EnemyTemplate(NamedTuple):
+    """Unscaled definition of an enemy type."""
+    name: str
+    max_hp: int
+    max_cursed_energy: int
+    difficulty: str = "normal"
+    ai_pattern: str = "aggressive"
+    max_phases: int = 1
+    phase_transition_messages: Tuple[str, ...] = ()
+
+    def create(self, enemy_type: Optional[str] = None) -> Enemy:
+        """Create a new enemy from this template."""
+        enemy = Enemy(self.name, self.max_hp, self.max_cursed_energy, self.difficulty)
+        enemy.ai_pattern = self.ai_pattern
+        enemy.max_phases = self.max_phases
+        enemy.phase_transition_messages = self.phase_transition_messages
+        enemy.enemy_type = enemy_type
+        return enemy
+
+
+def _parse_template(key: str, data: Dict) -> EnemyTemplate:
+    """Validate one template record."""
+    template = EnemyTemplate(
+        data["name"],
+        int(data["max_hp"]),
+        int(data["max_cursed_energy"]),
+        data.get("difficulty", "normal"),
+        data.get("ai_pattern", "aggressive"),
+        int(data.get("max_phases", 1)),
+        tuple(data.get("phase_transition_messages", ()))
+    )
+    if template.ai_pattern not in AI_PATTERNS:
+        raise ValueError(f"Enemy {key} has unknown AI pattern: {template.ai_pattern}")
+    if template.max_hp <= 0 or template.max_phases < 1:
+        raise ValueError(f"Enemy {key} needs positive HP and at least one phase")
+    return template
+
+
+class EnemyRegistry:
+    """Enemy templates by type key, with a fallback for unknown types."""
+
+    def __init__(self, template_file: str = ENEMY_TEMPLATE_FILE):
+        with open(template_file, "r") as f:
+            data = json.load(f)
+
+        self.default = _parse_template("default", data["default"])
+        self.templates: Dict[str, EnemyTemplate] = {
+            key: _parse_template(key, record) for key, record in data["enemies"].items()
+        }
+
+    def get_template(self, enemy_type: str) -> EnemyTemplate:
+        """Get the template for an enemy type, or the default for unknown types."""
+        return self.templates.get(enemy_type, self.default)
+
+    def create_enemy(self, enemy_type: str) -> Enemy:
+        """Create a new unscaled enemy of a type."""
+        return self.get_template(enemy_type).create(enemy_type)
+
+
+class EnemyPool:
+    """Recycles released enemies per type; acquire() resets them in place."""
+
+    def __init__(self, registry: Optional[EnemyRegistry] = None, max_free_per_type: int = 32):
+        self.registry = registry or get_enemy_registry()
+        self.max_free_per_type = max_free_per_type
+        self._free: Dict[str, List[Enemy]] = {}
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, enemy_type: str, level: int = 1, hp_bonus: int = 0,
+                ce_bonus: int = 0) -> Enemy:
+        """Get an enemy of a type at full strength for the given level and stat bonus."""
+        free = self._free.get(enemy_type)
+        if free:
+            enemy = free.pop()
+            self.reused += 1
+        else:
+            enemy = self.registry.create_enemy(enemy_type)
+            self.created += 1
+        return enemy.reset(level, hp_bonus, ce_bonus)
+
+    def release(self, enemy: Enemy):
+        """Return an enemy whose fight is over; the caller must not use it afterwards."""
+        if enemy.enemy_type is None:
+            return  # Not created by a registry
+        free = self._free.setdefault(enemy.enemy_type, [])
+        if len(free) < self.max_free_per_type:
+            free.append(enemy)
+
+    def clear(self):
+        """Drop every pooled enemy."""
+        self._free.clear()
+
+
+# Process-wide registry and pool, created on first use
+_enemy_registry: Optional[EnemyRegistry] = None
+_enemy_pool: Optional[EnemyPool] = None
+_enemy_lock = threading.Lock()
+
+
+def get_enemy_registry() -> EnemyRegistry:
+    """Get the global enemy registry, loading it on first use."""
+    global _enemy_registry
+    registry = _enemy_registry
+    if registry is None:
+        with _enemy_lock:
+            if _enemy_registry is None:
+                _enemy_registry = EnemyRegistry()
+            registry = _enemy_registry
+    return registry
+
+
+def get_enemy_pool() -> EnemyPool:
+    """Get the global enemy pool, creating it on first use."""
+    global _enemy_pool
+    pool = _enemy_pool
+    if pool is None:
+        registry = get_enemy_registry()
+        with _enemy_lock:
+            if _enemy_pool is None:
+                _enemy_pool = EnemyPool(registry)
+            pool = _enemy_pool
+    return pool
+
+
+def reset_enemy_registry():
+    """Discard the global registry and pool so the next call reloads them (for tests)."""
+    global _enemy_registry, _enemy_pool
+    with _enemy_lock:
+        _enemy_registry = None
+        _enemy_pool = None
@@ -4,12 +4,17 @@ Game State Management System
 Handles saving/loading game progress, player state, and story progression.
 """
 
-import json
 import os
-import pickle
-from typing import Dict, Any, Optional
+from collections import Counter
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+from autosave import BackgroundSaveWriter
+from journal import JOURNALED_FIELDS, ChoicePoint, GameJournal
+from save_format import SaveFormatError, SaveLog, inventory_counts, read_header, read_save
+from save_slots import SaveSlots
+from save_store import ProfileSaveLog, SQLiteSaveStore
+
 
 class GameState:
     """Manages the overall game state including player progress, story state, and save/load functionality."""
@@ -20,10 +25,25 @@ class GameState:
         self.current_location = "Tokyo Jujutsu High"
         self.story_flags = {}  # Track story progression and choices
         self.relationships = {}  # NPC relationships
-        self.unlocked_techniques = []
-        self.completed_missions = []
-        self.inventory = []
+        # Insertion-ordered sets (dicts with None values) and item -> quantity stacks
+        self.unlocked_techniques: Dict[str, None] = {}
+        self.completed_missions: Dict[str, None] = {}
+        self.inventory: Counter = Counter()
         self.save_file = "jjk_save.dat"
+        self.save_slots: Optional[SaveSlots] = None
+        self.save_slot: Optional[int] = None
+        self.save_store: Optional[SQLiteSaveStore] = None
+        self.save_profile: Optional[str] = None
+        self._save_writer: Optional[BackgroundSaveWriter] = None
+        self.journal = GameJournal(self._journaled_fields())
+    
+    def _journaled_fields(self) -> Dict[str, Any]:
+        """Current values of the fields the journal tracks."""
+        return {field: getattr(self, field) for field in JOURNALED_FIELDS}
+    
+    def _record(self, field: str, key: Any, value: Any):
+        """Append a change to the journal."""
+        self.journal.record((field, key, value))
     
     def set_player(self, player):
         """Set the current player."""
@@ -32,6 +52,7 @@ class GameState:
     def add_story_flag(self, flag_name: str, value: Any):
         """Add or update a story flag."""
         self.story_flags[flag_name] = value
+        self._record('story_flags', flag_name, value)
     
     def get_story_flag(self, flag_name: str, default=None):
         """Get a story flag value."""
@@ -45,6 +66,7 @@ class GameState:
         
         # Clamp between -100 and 100
         self.relationships[npc_name] = max(-100, min(100, self.relationships[npc_name]))
+        self._record('relationships', npc_name, self.relationships[npc_name])
     
     def get_relationship(self, npc_name: str) -> int:
         """Get relationship level with an NPC."""
@@ -52,8 +74,8 @@ class GameState:
     
     def unlock_technique(self, technique_name: str):
         """Unlock a new cursed technique."""
-        if technique_name not in self.unlocked_techniques:
-            self.unlocked_techniques.append(technique_name)
+        self.unlocked_techniques[technique_name] = None
+        self._record('unlocked_techniques', technique_name, None)
     
     def has_technique(self, technique_name: str) -> bool:
         """Check if a technique is unlocked."""
@@ -61,8 +83,8 @@ class GameState:
     
     def complete_mission(self, mission_name: str):
         """Mark a mission as completed."""
-        if mission_name not in self.completed_missions:
-            self.completed_missions.append(mission_name)
+        self.completed_missions[mission_name] = None
+        self._record('completed_missions', mission_name, None)
     
     def is_mission_completed(self, mission_name: str) -> bool:
         """Check if a mission is completed."""
@@ -74,97 +96,222 @@ class GameState:
             self.current_chapter = new_chapter
         else:
             self.current_chapter += 1
+        self._record('current_chapter', None, self.current_chapter)
     
     def set_location(self, location: str):
         """Set the current location."""
         self.current_location = location
+        self._record('current_location', None, location)
     
-    def add_to_inventory(self, item: str):
-        """Add an item to inventory."""
-        self.inventory.append(item)
+    def add_to_inventory(self, item: str, quantity: int = 1):
+        """Add items to inventory."""
+        self.inventory[item] += quantity
+        self._record('inventory', item, self.inventory[item])
     
-    def remove_from_inventory(self, item: str) -> bool:
-        """Remove an item from inventory. Returns True if successful."""
-        if item in self.inventory:
-            self.inventory.remove(item)
-            return True
-        return False
+    def remove_from_inventory(self, item: str, quantity: int = 1) -> bool:
+        """Remove items from inventory. Returns True if there were enough to remove."""
+        count = self.inventory.get(item, 0)
+        if count < quantity:
+            return False
+        if count == quantity:
+            del self.inventory[item]
+        else:
+            self.inventory[item] = count - quantity
+        self._record('inventory', item, count - quantity)
+        return True
+    
+    def get_item_count(self, item: str) -> int:
+        """Get how many of an item are in inventory."""
+        return self.inventory.get(item, 0)
     
     def has_item(self, item: str) -> bool:
         """Check if an item is in inventory."""
         return item in self.inventory
     
+    def mark_choice(self, scene: str, choice: str):
+        """Mark a story choice about to be applied, so the game can rewind to it."""
+        self.journal.mark_choice(scene, choice, self.player.to_dict() if self.player else None)
+    
+    def choice_points(self) -> List[ChoicePoint]:
+        """Story choices that can be rewound to, oldest first."""
+        return list(self.journal.choices)
+    
+    def rewind_to_choice(self, index: int = -1) -> Optional[ChoicePoint]:
+        """Return to the state right before a story choice, discarding everything after it.
+        
+        Returns the choice point, whose scene the story should resume from, or None
+        if there is no choice to rewind to.
+        """
+        if not self.journal.choices:
+            return None
+        
+        # Import Player class here to avoid circular imports
+        from character import Player
+        
+        choice, fields = self.journal.rewind(index)
+        for field, value in fields.items():
+            setattr(self, field, value)
+        if choice.player_data is not None:
+            self.player = Player.from_dict(choice.player_data)
+        return choice
+    
+    def use_slot(self, slot: int, save_slots: Optional[SaveSlots] = None):
+        """Save to and load from a numbered save slot."""
+        self.save_slots = save_slots or self.save_slots or SaveSlots()
+        self.save_slot = slot
+        self.save_file = self.save_slots.slot_path(slot)
+        self.save_store = None
+        self.save_profile = None
+        os.makedirs(self.save_slots.directory, exist_ok=True)
+    
+    def use_profile(self, store: SQLiteSaveStore, profile_id: str):
+        """Save to and load from a profile in a SQLite save store instead of a file."""
+        self.save_store = store
+        self.save_profile = profile_id
+        self.save_slots = None
+        self.save_slot = None
+    
+    def _get_save_writer(self) -> BackgroundSaveWriter:
+        """Get the background writer for the current save file or profile."""
+        if self.save_store is not None:
+            save_log = ProfileSaveLog(self.save_store, self.save_profile)
+        else:
+            save_log = SaveLog(self.save_file)
+        
+        if self._save_writer is None or self._save_writer.save_log.path != save_log.path:
+            if self._save_writer is not None:
+                self._save_writer.close()
+            on_saved = None
+            if self.save_slots is not None and self.save_slot is not None:
+                slots, slot = self.save_slots, self.save_slot
+                on_saved = lambda header: slots.record_save(slot, header)
+            self._save_writer = BackgroundSaveWriter(save_log, on_saved)
+        return self._save_writer
+    
+    def _has_save(self) -> bool:
+        """Check whether the current save file or profile exists."""
+        if self.save_store is not None:
+            self.flush_saves()
+            return self.save_store.has_profile(self.save_profile)
+        return os.path.exists(self.save_file)
+    
+    def to_save_state(self) -> Dict[str, Any]:
+        """Get the saved fields of the game state."""
+        return {
+            'player_data': self.player.to_dict() if self.player else None,
+            'current_chapter': self.current_chapter,
+            'current_location': self.current_location,
+            'story_flags': self.story_flags,
+            'relationships': self.relationships,
+            'unlocked_techniques': list(self.unlocked_techniques),
+            'completed_missions': list(self.completed_missions),
+            'inventory': dict(self.inventory)
+        }
+    
+    def snapshot_save_state(self) -> Dict[str, Any]:
+        """Copy the saved fields so they can be serialized while the game keeps changing."""
+        state = self.to_save_state()
+        for field in ('story_flags', 'relationships'):
+            state[field] = dict(state[field])
+        return state
+    
+    def restore_save_state(self, save_data: Dict[str, Any]):
+        """Restore the game state from saved fields."""
+        # Import Player class here to avoid circular imports
+        from character import Player
+        
+        self.player = Player.from_dict(save_data['player_data']) if save_data.get('player_data') else None
+        self.current_chapter = save_data.get('current_chapter', 1)
+        self.current_location = save_data.get('current_location', "Tokyo Jujutsu High")
+        self.story_flags = save_data.get('story_flags', {})
+        self.relationships = save_data.get('relationships', {})
+        self.unlocked_techniques = dict.fromkeys(save_data.get('unlocked_techniques', []))
+        self.completed_missions = dict.fromkeys(save_data.get('completed_missions', []))
+        # Saves before format version 3 list every item individually
+        self.inventory = inventory_counts(save_data.get('inventory', {}))
+        # Choices from before the load belong to another playthrough
+        self.journal = GameJournal(self._journaled_fields())
+    
     def save_game(self) -> bool:
-        """Save the current game state to file."""
-        try:
-            save_data = {
-                'timestamp': datetime.now().isoformat(),
-                'player_data': self.player.to_dict() if self.player else None,
-                'current_chapter': self.current_chapter,
-                'current_location': self.current_location,
-                'story_flags': self.story_flags,
-                'relationships': self.relationships,
-                'unlocked_techniques': self.unlocked_techniques,
-                'completed_missions': self.completed_missions,
-                'inventory': self.inventory
-            }
-            
-            with open(self.save_file, 'wb') as f:
-                pickle.dump(save_data, f)
-            
-            print(f"Game saved successfully! ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})")
-            return True
-            
-        except Exception as e:
-            print(f"Failed to save game: {e}")
+        """Save the current game state and wait until it is on disk."""
+        writer = self._get_save_writer()
+        writer.wait(writer.request(self.snapshot_save_state(), datetime.now().isoformat()))
+        
+        if writer.last_error is not None:
+            print(f"Failed to save game: {writer.last_error}")
             return False
+        print(f"Game saved successfully! ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})")
+        return True
+    
+    def autosave(self):
+        """Queue a save without waiting; bursts of autosaves are written once."""
+        self._get_save_writer().request(self.snapshot_save_state(), datetime.now().isoformat())
+    
+    def flush_saves(self):
+        """Wait for queued saves to reach the disk."""
+        if self._save_writer is not None:
+            self._save_writer.wait()
+    
+    def close_saves(self):
+        """Finish queued saves and stop the background writer."""
+        if self._save_writer is not None:
+            self._save_writer.close()
+            self._save_writer = None
     
     def load_game(self) -> bool:
-        """Load game state from file."""
+        """Load game state from the save file or profile."""
         try:
-            if not os.path.exists(self.save_file):
+            if not self._has_save():
                 return False
             
-            with open(self.save_file, 'rb') as f:
-                save_data = pickle.load(f)
+            writer = self._get_save_writer()
+            writer.wait()
+            save_data, timestamp = writer.save_log.load()
+            self.restore_save_state(save_data)
             
-            # Import Player class here to avoid circular imports
-            from character import Player
-            
-            # Restore game state
-            if save_data.get('player_data'):
-                self.player = Player.from_dict(save_data['player_data'])
-            
-            self.current_chapter = save_data.get('current_chapter', 1)
-            self.current_location = save_data.get('current_location', "Tokyo Jujutsu High")
-            self.story_flags = save_data.get('story_flags', {})
-            self.relationships = save_data.get('relationships', {})
-            self.unlocked_techniques = save_data.get('unlocked_techniques', [])
-            self.completed_missions = save_data.get('completed_missions', [])
-            self.inventory = save_data.get('inventory', [])
-            
-            timestamp = save_data.get('timestamp', 'Unknown')
             print(f"Game loaded successfully! (Saved: {timestamp})")
             return True
             
+        except SaveFormatError as e:
+            print(f"Failed to load game: unreadable save file ({e})")
+            return False
         except Exception as e:
             print(f"Failed to load game: {e}")
             return False
     
     def get_save_info(self) -> Optional[Dict[str, Any]]:
-        """Get information about the save file without loading it."""
+        """Get information about the save file from its header, without loading it."""
         try:
-            if not os.path.exists(self.save_file):
+            if not self._has_save():
                 return None
             
-            with open(self.save_file, 'rb') as f:
-                save_data = pickle.load(f)
+            if self.save_store is not None:
+                info = self.save_store.get_profile_info(self.save_profile)
+                return {
+                    'timestamp': info.last_played,
+                    'chapter': info.chapter,
+                    'location': info.location,
+                    'player_name': info.player_name or 'Unknown'
+                }
+            
+            self.flush_saves()
+            header = read_header(self.save_file)
+            if header is None:
+                # Version 1 saves have no header
+                contents = read_save(self.save_file)
+                save_data = contents.state
+                return {
+                    'timestamp': contents.timestamps[-1],
+                    'chapter': save_data['current_chapter'],
+                    'location': save_data['current_location'],
+                    'player_name': save_data['player_data'].get('name', 'Unknown') if save_data['player_data'] else 'Unknown'
+                }
             
             return {
-                'timestamp': save_data.get('timestamp', 'Unknown'),
-                'chapter': save_data.get('current_chapter', 1),
-                'location': save_data.get('current_location', 'Unknown'),
-                'player_name': save_data.get('player_data', {}).get('name', 'Unknown') if save_data.get('player_data') else 'Unknown'
+                'timestamp': header.get('timestamp', 'Unknown'),
+                'chapter': header.get('chapter', 1),
+                'location': header.get('location', 'Unknown'),
+                'player_name': header.get('player_name', 'Unknown')
             }
             
         except Exception:
@@ -172,7 +319,12 @@ class GameState:
     
     def delete_save(self) -> bool:
         """Delete the save file."""
+        self.flush_saves()
         try:
+            if self.save_store is not None:
+                return self.save_store.delete_profile(self.save_profile)
+            if self.save_slots is not None and self.save_slot is not None:
+                return self.save_slots.delete_slot(self.save_slot)
             if os.path.exists(self.save_file):
                 os.remove(self.save_file)
                 return True
@@ -0,0 +1,135 @@
+"""
+Game State Journal
+
+Records every GameState mutation as a small entry in an append-only journal,
+with a snapshot of the journaled fields taken every SNAPSHOT_INTERVAL entries.
+Each snapshot is built from the previous one plus the entries since it: fields
+the entries did not touch are shared with the previous snapshot, and only the
+changed ones are copied, so a snapshot costs what changed rather than the
+whole state. Past MAX_SNAPSHOTS the older snapshots are thinned out.
+Story choices are marked in the journal, so rewinding to one restores the
+nearest earlier snapshot and replays only the entries after it, instead of
+keeping a full save per choice.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+SNAPSHOT_INTERVAL = 64  # Entries between snapshots
+MAX_JOURNAL_ENTRIES = 20000  # Older entries and choices are dropped past this
+MAX_SNAPSHOTS = 32  # Older snapshots are thinned out past this
+
+# GameState fields covered by the journal
+JOURNALED_FIELDS = ('current_chapter', 'current_location', 'story_flags', 'relationships',
+                    'unlocked_techniques', 'completed_missions', 'inventory')
+
+# An entry is (field, key, value): field[key] = value, or field = value when key is None.
+# Inventory entries hold the new quantity, where 0 removes the item.
+JournalEntry = Tuple[str, Any, Any]
+
+
+class ChoicePoint(NamedTuple):
+    """A story choice the game can rewind to."""
+    position: int  # Journal position right before the choice
+    scene: str
+    choice: str
+    player_data: Optional[Dict[str, Any]]  # Player state before the choice
+
+
+def copy_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy journaled fields so later mutations do not reach the copy."""
+    return {field: value.copy() if isinstance(value, dict) else value
+            for field, value in fields.items()}
+
+
+def apply_entry(fields: Dict[str, Any], entry: JournalEntry):
+    """Apply one journal entry to a copy of the journaled fields."""
+    field, key, value = entry
+    if key is None:
+        fields[field] = value
+    elif field == 'inventory' and not value:
+        fields[field].pop(key, None)
+    else:
+        fields[field][key] = value
+
+
+class GameJournal:
+    """Append-only journal of GameState changes with periodic snapshots."""
+
+    def __init__(self, base: Dict[str, Any], snapshot_interval: int = SNAPSHOT_INTERVAL,
+                 max_entries: int = MAX_JOURNAL_ENTRIES, max_snapshots: int = MAX_SNAPSHOTS):
+        self.snapshot_interval = snapshot_interval
+        self.max_entries = max_entries
+        self.max_snapshots = max(2, max_snapshots)
+        self.entries: List[JournalEntry] = []
+        # Snapshots share unchanged field values with each other and are never mutated
+        self.snapshots: List[Tuple[int, Dict[str, Any]]] = [(0, copy_fields(base))]
+        self.choices: List[ChoicePoint] = []
+
+    def record(self, entry: JournalEntry):
+        """Append an entry, taking a snapshot when one is due."""
+        self.entries.append(entry)
+        if len(self.entries) - self.snapshots[-1][0] >= self.snapshot_interval:
+            self.snapshots.append((len(self.entries), self._next_snapshot()))
+            if len(self.entries) > self.max_entries:
+                self._trim()
+            if len(self.snapshots) > self.max_snapshots:
+                self._thin_snapshots()
+
+    def _next_snapshot(self) -> Dict[str, Any]:
+        """The previous snapshot with the entries since it applied, copying only changed fields."""
+        position, previous = self.snapshots[-1]
+        snapshot = dict(previous)
+        copied = set()
+        for entry in self.entries[position:]:
+            field, key, _ = entry
+            if key is not None and field not in copied:
+                snapshot[field] = snapshot[field].copy()
+                copied.add(field)
+            apply_entry(snapshot, entry)
+        return snapshot
+
+    def mark_choice(self, scene: str, choice: str, player_data: Optional[Dict[str, Any]]):
+        """Remember the current position as a story choice."""
+        self.choices.append(ChoicePoint(len(self.entries), scene, choice, player_data))
+
+    def state_at(self, position: int) -> Dict[str, Any]:
+        """Rebuild the journaled fields at a journal position."""
+        snapshot_position, snapshot = self.snapshots[0]
+        for candidate_position, candidate in reversed(self.snapshots):
+            if candidate_position <= position:
+                snapshot_position, snapshot = candidate_position, candidate
+                break
+
+        fields = copy_fields(snapshot)
+        for entry in self.entries[snapshot_position:position]:
+            apply_entry(fields, entry)
+        return fields
+
+    def rewind(self, index: int = -1) -> Tuple[ChoicePoint, Dict[str, Any]]:
+        """Rewind to a choice, dropping it and everything after; returns it and the fields."""
+        choice = self.choices[index]
+        fields = self.state_at(choice.position)
+
+        del self.entries[choice.position:]
+        self.snapshots = [(position, snapshot) for position, snapshot in self.snapshots
+                          if position <= choice.position]
+        del self.choices[index:]
+        return choice, fields
+
+    def _thin_snapshots(self):
+        """Drop every other snapshot in the older half; old choices replay a little further."""
+        middle = len(self.snapshots) // 2
+        # The first snapshot stays so every position still has one at or before it
+        self.snapshots = self.snapshots[:1] + self.snapshots[2:middle:2] + self.snapshots[middle:]
+
+    def _trim(self):
+        """Drop entries before the oldest snapshot still inside the size limit."""
+        cutoff = len(self.entries) - self.max_entries
+        start = next(position for position, _ in self.snapshots if position >= cutoff)
+
+        del self.entries[:start]
+        self.snapshots = [(position - start, snapshot) for position, snapshot in self.snapshots
+                          if position >= start]
+        self.choices = [choice._replace(position=choice.position - start)
+                        for choice in self.choices if choice.position >= start]
@@ -6,6 +6,7 @@ A turn-based RPG following the Jujutsu Kaisen manga with player choice-driven st
 character evolution, and strategic combat featuring cursed techniques.
 """
 
+import argparse
 import os
 import sys
 from typing import Optional
@@ -13,6 +14,8 @@ from typing import Optional
 from game_state import GameState
 from character import Player
 from story import StoryManager
+from enemies import get_enemy_pool
+from save_slots import SaveSlots
 from combat import CombatSystem
 
 
@@ -21,6 +24,7 @@ class JujutsuKaisenRPG:
     
     def __init__(self):
         self.game_state = GameState()
+        self.save_slots = SaveSlots()
         self.player: Optional[Player] = None
         self.story_manager = StoryManager()
         self.combat_system = CombatSystem()
@@ -29,8 +33,15 @@ class JujutsuKaisenRPG:
     def start_game(self):
         """Initialize and start the game."""
         self.display_title()
+        self.import_legacy_save()
         self.show_main_menu()
     
+    def import_legacy_save(self):
+        """Move a save from before numbered slots into a slot so it shows on the load screen."""
+        slot = self.save_slots.import_legacy_save()
+        if slot is not None:
+            print(f"Your existing save was moved to slot {slot}.")
+    
     def display_title(self):
         """Display the game title and introduction."""
         print("=" * 60)
@@ -73,6 +84,7 @@ class JujutsuKaisenRPG:
         
         self.player = Player(name)
         self.game_state.set_player(self.player)
+        self.game_state.use_slot(self.save_slots.next_free_slot(), self.save_slots)
         
         print(f"\nWelcome, {name}!")
         print("Your journey as a Jujutsu Sorcerer begins...")
@@ -81,9 +93,42 @@ class JujutsuKaisenRPG:
         self.story_manager.start_story(self.game_state)
         self.game_loop()
     
+    def start_from_checkpoint(self, target):
+        """Start at a chapter number or scene name from the cached story checkpoints (for QA)."""
+        # Checkpoints pull in the simulation modules, which normal play never needs
+        from checkpoints import fast_forward
+        
+        if not fast_forward(self.game_state, self.story_manager, target):
+            print(f"No checkpoint for {target}.")
+            return
+        
+        self.player = self.game_state.player
+        self.game_state.use_slot(self.save_slots.next_free_slot(), self.save_slots)
+        print(f"\nFast-forwarded to chapter {self.game_state.current_chapter} "
+              f"({self.story_manager.current_scene}) as {self.player.name}.")
+        self.game_loop()
+    
     def load_game(self):
         """Load a saved game."""
         print("\n=== LOAD GAME ===")
+        slots = self.save_slots.list_slots()
+        if not slots:
+            print("No saved games found.")
+            return
+        
+        for info in slots:
+            print(f"{info.slot}. {info.player_name} (Level {info.level}) - Chapter {info.chapter}, "
+                  f"{info.location} [{info.timestamp[:16].replace('T', ' ')}]")
+        try:
+            slot = int(input("\nChoose a save slot: "))
+        except ValueError:
+            print("Invalid slot.")
+            return
+        if slot not in {info.slot for info in slots}:
+            print("Invalid slot.")
+            return
+        
+        self.game_state.use_slot(slot, self.save_slots)
         if self.game_state.load_game():
             self.player = self.game_state.player
             self.story_manager.load_story_state(self.game_state)
@@ -119,6 +164,7 @@ class JujutsuKaisenRPG:
             if result.get("combat"):
                 enemy = result["enemy"]
                 combat_result = self.combat_system.start_combat(self.player, enemy)
+                get_enemy_pool().release(enemy)
                 if not combat_result:
                     print("Game Over!")
                     self.running = False
@@ -128,9 +174,9 @@ class JujutsuKaisenRPG:
                 print(result.get("message", "Game Over!"))
                 self.running = False
             
-            # Auto-save progress
+            # Auto-save progress in the background
             if self.game_state.current_chapter % 5 == 0:  # Save every 5 chapters
-                self.game_state.save_game()
+                self.game_state.autosave()
     
     def display_actions(self, actions):
         """Display available actions to the player."""
@@ -138,18 +184,27 @@ class JujutsuKaisenRPG:
         for i, action in enumerate(actions, 1):
             print(f"{i}. {action['text']}")
         print(f"{len(actions) + 1}. Save Game")
-        print(f"{len(actions) + 2}. Return to Main Menu")
+        print(f"{len(actions) + 2}. Rewind to Last Choice")
+        print(f"{len(actions) + 3}. Return to Main Menu")
     
     def get_player_choice(self, num_actions):
         """Get and validate player choice."""
         try:
-            choice = int(input(f"\nEnter your choice (1-{num_actions + 2}): "))
+            choice = int(input(f"\nEnter your choice (1-{num_actions + 3}): "))
             
             if choice == num_actions + 1:
                 self.game_state.save_game()
                 print("Game saved!")
                 return None
             elif choice == num_actions + 2:
+                undone = self.story_manager.rewind_to_last_choice(self.game_state)
+                if undone is None:
+                    print("There is no choice to rewind to.")
+                else:
+                    self.player = self.game_state.player
+                    print(f"⏪ Rewound to before: {undone}")
+                return None
+            elif choice == num_actions + 3:
                 self.running = False
                 return None
             elif 1 <= choice <= num_actions:
@@ -170,15 +225,29 @@ class JujutsuKaisenRPG:
 
 def main():
     """Main entry point for the game."""
+    parser = argparse.ArgumentParser(description="Jujutsu Kaisen RPG")
+    parser.add_argument("--checkpoint", metavar="CHAPTER_OR_SCENE",
+                        help="skip to a chapter number or scene name (for QA)")
+    args = parser.parse_args()
+    
+    game = None
     try:
         game = JujutsuKaisenRPG()
-        game.start_game()
+        if args.checkpoint:
+            game.display_title()
+            target = int(args.checkpoint) if args.checkpoint.isdigit() else args.checkpoint
+            game.start_from_checkpoint(target)
+        else:
+            game.start_game()
     except KeyboardInterrupt:
         print("\n\nGame interrupted by user. Goodbye!")
     except Exception as e:
         print(f"\nAn error occurred: {e}")
         print("The game will now exit.")
     finally:
+        if game is not None:
+            # Let a queued autosave finish before the process exits
+            game.game_state.close_saves()
         sys.exit(0)
 
 
@@ -6,8 +6,9 @@ through character bonds.
 """
 
 from typing import Dict, List, Any, Optional
-from character import Trait
+from character import Trait, trait_mask
 import random
+import threading
 
 
 class NPC:
@@ -18,6 +19,9 @@ class NPC:
                  special_abilities: Dict[int, str]):
         self.name = name
         self.personality_traits = personality_traits
+        # Player traits matching this personality, for compatibility checks
+        self.trait_mask = trait_mask(trait for trait in Trait
+                                     if trait.value.lower() in personality_traits)
         self.dialogue_options = dialogue_options  # Different dialogue based on relationship
         self.special_abilities = special_abilities  # Unlocked at relationship thresholds
         self.current_relationship = 0
@@ -347,11 +351,10 @@ class NPCManager:
         base_gain = random.randint(1, 3)
         
         # Check personality compatibility
-        player_traits = [trait.value.lower() for trait in player.get_dominant_traits()]
-        compatible_traits = set(player_traits) & set(npc.personality_traits)
+        compatible_traits = player.dominant_mask & npc.trait_mask
         
-        # Bonus for compatible personalities
-        compatibility_bonus = len(compatible_traits)
+        # Bonus for compatible personalities: one per shared trait
+        compatibility_bonus = bin(compatible_traits).count("1")
         
         return base_gain + compatibility_bonus
     
@@ -464,6 +467,24 @@ class NPCManager:
         })
 
 
+_npc_manager: Optional[NPCManager] = None
+_npc_manager_lock = threading.Lock()
+
+
 def get_npc_manager() -> NPCManager:
-    """Get the global NPC manager instance."""
-    return NPCManager()
\ No newline at end of file
+    """Get the global NPC manager instance, creating it on first use."""
+    global _npc_manager
+    manager = _npc_manager
+    if manager is None:
+        with _npc_manager_lock:
+            if _npc_manager is None:
+                _npc_manager = NPCManager()
+            manager = _npc_manager
+    return manager
+
+
+def reset_npc_manager():
+    """Discard the global NPC manager so the next call rebuilds it (for tests)."""
+    global _npc_manager
+    with _npc_manager_lock:
+        _npc_manager = None
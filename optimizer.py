@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Evolutionary Build Optimizer
+
+Evolves player configurations (trait values plus a technique loadout drawn from
+the technique library) to maximize win rate against a set of target enemies.
+Fitness is evaluated in a process pool and cached per genome, so a build that
+reappears in later generations is never simulated twice.
+"""
+
+import multiprocessing
+import random
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from character import Player, Trait
+from simulation import ENEMY_TYPES, level_player, shared_technique_library, win_rate
+
+
+TRAITS = list(Trait)
+TRAIT_STEP = 10  # Trait values are searched in steps of 10 (0-100)
+
+
+class BuildGenome(NamedTuple):
+    """A player build: one value per trait (in Trait order) and a technique loadout."""
+    traits: Tuple[int, ...]
+    loadout: Tuple[str, ...]
+
+    def describe(self) -> str:
+        """Describe the build in a single line."""
+        traits = ", ".join(f"{trait.value} {value}"
+                           for trait, value in zip(TRAITS, self.traits) if value)
+        return f"[{traits or 'no traits'}] {' / '.join(self.loadout)}"
+
+
+def genome_to_player(genome: BuildGenome, level: int) -> Player:
+    """Create a player from a genome at the given level."""
+    player = Player("Evolved Sorcerer")
+    for trait, value in zip(TRAITS, genome.traits):
+        if value:
+            player.modify_trait(trait, value)
+    level_player(player, level)
+
+    library = shared_technique_library()
+    player.techniques = [library.get_technique(key) for key in genome.loadout]
+    return player
+
+
+def _genome_fitness(task: Tuple[BuildGenome, List[Tuple[str, int]], int, int, int]) -> float:
+    """Average win rate of a genome over the target enemies."""
+    genome, targets, level, fights, seed = task
+    random.seed(f"{seed}:{genome}")
+
+    make_player = lambda lvl: genome_to_player(genome, lvl)
+    # The build is always played at its own level; only the enemy follows the target
+    rates = [win_rate(make_player, enemy_type, level, fights, enemy_level or level)
+             for enemy_type, enemy_level in targets]
+    return sum(rates) / len(rates) if rates else 0.0
+
+
+class BuildOptimizer:
+    """Genetic search over trait vectors and technique loadouts."""
+
+    def __init__(self, targets: Optional[List[Tuple[str, int]]] = None, level: int = 20,
+                 loadout_size: int = 4, population_size: int = 24, fights: int = 20,
+                 mutation_rate: float = 0.2, elite_count: int = 2, seed: int = 0,
+                 processes: Optional[int] = None):
+        # Each target is (enemy_type, level); a level of 0 means "the build's level"
+        self.targets = targets or [(enemy_type, 0) for enemy_type in ENEMY_TYPES]
+        self.level = level
+        self.loadout_size = loadout_size
+        self.population_size = population_size
+        self.fights = fights
+        self.mutation_rate = mutation_rate
+        self.elite_count = elite_count
+        self.seed = seed
+        self.processes = processes
+        self.rng = random.Random(seed)
+        self.technique_pool = list(shared_technique_library().techniques.keys())
+        self.fitness_cache: Dict[BuildGenome, float] = {}
+        self.evaluations = 0
+
+    def random_genome(self) -> BuildGenome:
+        """Create a random genome."""
+        traits = tuple(self.rng.randrange(0, 101, TRAIT_STEP) for _ in TRAITS)
+        loadout = tuple(sorted(self.rng.sample(self.technique_pool, self.loadout_size)))
+        return BuildGenome(traits, loadout)
+
+    def mutate(self, genome: BuildGenome) -> BuildGenome:
+        """Nudge trait values and swap techniques at the mutation rate."""
+        traits = list(genome.traits)
+        for i in range(len(traits)):
+            if self.rng.random() < self.mutation_rate:
+                step = self.rng.choice((-2, -1, 1, 2)) * TRAIT_STEP
+                traits[i] = max(0, min(100, traits[i] + step))
+
+        loadout = list(genome.loadout)
+        for i in range(len(loadout)):
+            if self.rng.random() < self.mutation_rate:
+                candidates = [t for t in self.technique_pool if t not in loadout]
+                if candidates:
+                    loadout[i] = self.rng.choice(candidates)
+
+        return BuildGenome(tuple(traits), tuple(sorted(loadout)))
+
+    def crossover(self, first: BuildGenome, second: BuildGenome) -> BuildGenome:
+        """Combine two parents: uniform trait mixing and a shared technique pool."""
+        traits = tuple(self.rng.choice(pair) for pair in zip(first.traits, second.traits))
+        techniques = sorted(set(first.loadout) | set(second.loadout))
+        loadout = tuple(sorted(self.rng.sample(techniques, min(self.loadout_size, len(techniques)))))
+        return BuildGenome(traits, loadout)
+
+    def evaluate(self, genomes: List[BuildGenome], pool=None) -> List[float]:
+        """Get the fitness of each genome, simulating only those not seen before."""
+        pending = list(dict.fromkeys(g for g in genomes if g not in self.fitness_cache))
+        if pending:
+            tasks = [(g, self.targets, self.level, self.fights, self.seed) for g in pending]
+            results = pool.map(_genome_fitness, tasks) if pool else map(_genome_fitness, tasks)
+            for genome, fitness in zip(pending, results):
+                self.fitness_cache[genome] = fitness
+            self.evaluations += len(pending)
+
+        return [self.fitness_cache[g] for g in genomes]
+
+    def _select(self, ranked: List[Tuple[BuildGenome, float]]) -> BuildGenome:
+        """Tournament selection of a parent."""
+        contenders = self.rng.sample(ranked, min(3, len(ranked)))
+        return max(contenders, key=lambda item: item[1])[0]
+
+    def evolve(self, generations: int = 10, verbose: bool = False,
+               pool=None) -> List[Tuple[BuildGenome, float]]:
+        """Run the search and return the final population ranked by fitness.
+
+        Pass a WarmSimulationPool as pool to reuse its workers instead of starting new ones.
+        """
+        if pool is None:
+            with multiprocessing.Pool(self.processes) as new_pool:
+                return self.evolve(generations, verbose, new_pool)
+
+        population = [self.random_genome() for _ in range(self.population_size)]
+
+        for generation in range(generations + 1):
+            scores = self.evaluate(population, pool)
+            ranked = sorted(zip(population, scores), key=lambda item: item[1], reverse=True)
+
+            if verbose:
+                best, fitness = ranked[0]
+                print(f"Generation {generation}: best {fitness:.2f} - {best.describe()}")
+
+            if generation == generations:
+                break
+
+            population = [genome for genome, _ in ranked[:self.elite_count]]
+            while len(population) < self.population_size:
+                child = self.crossover(self._select(ranked), self._select(ranked))
+                population.append(self.mutate(child))
+
+        return ranked
+
+
+def main():
+    """Evolve builds against every enemy type and show the best ones."""
+    optimizer = BuildOptimizer()
+    ranked = optimizer.evolve(generations=10, verbose=True)
+
+    print(f"\nSimulated {optimizer.evaluations} unique builds.")
+    print("Top builds:")
+    for genome, fitness in ranked[:5]:
+        print(f"  {fitness:.2f}  {genome.describe()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Save Archive Analytics
+
+Aggregate statistics over large archives of save files: level distribution per
+chapter, dominant traits, relationship histograms and technique ownership.
+Save paths are streamed from a directory walk in fixed-size chunks, and only a
+bounded number of chunks are in flight at once. Each worker process reads only
+what its queries need (just the fixed-size header when that is enough) and
+returns per-query counters, which the parent merges as they arrive.
+"""
+
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from character import DOMINANT_TRAIT_THRESHOLD
+from cursed_techniques import get_technique_library
+from save_format import read_header, read_save, save_header
+
+
+SAVE_EXTENSIONS = (".sav", ".dat")
+CHUNK_SIZE = 256  # Save files per worker task
+HEADER_FIELDS = frozenset(("timestamp", "chapter", "location", "player_name", "level"))
+
+
+class SaveQuery(NamedTuple):
+    """A count over save files: each save adds one to every key it yields."""
+    name: str
+    description: str
+    fields: FrozenSet[str]  # Header fields and/or saved state fields the keys need
+    keys: Callable[[Dict[str, Any]], Iterable[Hashable]]
+
+
+class AnalyticsResult(NamedTuple):
+    """Merged counts of an analytics run."""
+    saves: int
+    errors: int  # Files that could not be read as saves or held unexpected values
+    counts: Dict[str, Counter]  # Query name -> key -> number of saves
+
+
+def _level_by_chapter(record: Dict[str, Any]) -> Iterator[Hashable]:
+    yield (record["chapter"], record["level"])
+
+
+def _dominant_traits(record: Dict[str, Any]) -> Iterator[Hashable]:
+    player = record["player_data"] or {}
+    for trait, value in player.get("traits", {}).items():
+        if value >= DOMINANT_TRAIT_THRESHOLD:
+            yield trait
+
+
+def _relationship_histogram(record: Dict[str, Any]) -> Iterator[Hashable]:
+    for npc, value in record["relationships"].items():
+        yield (npc, value // 10 * 10)
+
+
+def _technique_ownership(record: Dict[str, Any]) -> Iterator[Hashable]:
+    player = record["player_data"] or {}
+    library = get_technique_library()
+    for technique in player.get("techniques", []):
+        if "id" in technique:
+            yield technique["id"]
+            continue
+        # Inline definitions and the flat entries of older saves count under the
+        # catalog id when the catalog has the technique, so archives mixing save
+        # versions do not split one technique across two keys
+        name = technique.get("definition", technique)["name"]
+        yield library.get_key_by_name(name) or name
+
+
+QUERIES: Dict[str, SaveQuery] = {query.name: query for query in (
+    SaveQuery("level_by_chapter", "Player level distribution per chapter",
+              frozenset(("chapter", "level")), _level_by_chapter),
+    SaveQuery("dominant_traits", "Most common dominant traits",
+              frozenset(("player_data",)), _dominant_traits),
+    SaveQuery("relationships", "Relationship histogram per NPC (buckets of 10)",
+              frozenset(("relationships",)), _relationship_histogram),
+    SaveQuery("techniques", "Technique ownership",
+              frozenset(("player_data",)), _technique_ownership),
+)}
+
+
+def iter_save_paths(paths: Iterable[str]) -> Iterator[str]:
+    """Yield save files under the given files and directories, walking lazily."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        pending = [path]
+        while pending:
+            try:
+                entries = os.scandir(pending.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.endswith(SAVE_EXTENSIONS):
+                        yield entry.path
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group an iterable into lists of up to size items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def read_save_fields(path: str, fields: FrozenSet[str]) -> Dict[str, Any]:
+    """Read the given header and state fields of a save, decoding the body only if needed."""
+    if fields <= HEADER_FIELDS:
+        header = read_header(path)
+        if header is not None:
+            return {field: header.get(field) for field in fields}
+
+    # Version 1 saves have no header, and state fields need the snapshot and deltas
+    contents = read_save(path)
+    record = save_header(contents.state, contents.timestamps[-1]) if fields & HEADER_FIELDS else {}
+    record.update((field, contents.state[field]) for field in fields if field in contents.state)
+    return record
+
+
+def _analyze_chunk(task) -> AnalyticsResult:
+    """Worker: count one chunk of save files for the named queries."""
+    paths, query_names = task
+    queries = [QUERIES[name] for name in query_names]
+    fields = frozenset().union(*(query.fields for query in queries))
+    counts = {query.name: Counter() for query in queries}
+    saves = errors = 0
+
+    for path in paths:
+        try:
+            record = read_save_fields(path, fields)
+            # Count into a list first so one bad value cannot leave a save half counted
+            keys = [(query.name, list(query.keys(record))) for query in queries]
+        except Exception:
+            # Unreadable file, or a readable save with fields the queries cannot use
+            errors += 1
+            continue
+        saves += 1
+        for name, query_keys in keys:
+            counts[name].update(query_keys)
+
+    return AnalyticsResult(saves, errors, counts)
+
+
+def merge_results(total: AnalyticsResult, partial: AnalyticsResult) -> AnalyticsResult:
+    """Add a partial result into a running total; the total's counters are updated in place."""
+    for name, counter in partial.counts.items():
+        total.counts.setdefault(name, Counter()).update(counter)
+    return AnalyticsResult(total.saves + partial.saves, total.errors + partial.errors, total.counts)
+
+
+def analyze_saves(paths: Iterable[str], query_names: Optional[Sequence[str]] = None,
+                  processes: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+                  pool=None) -> AnalyticsResult:
+    """Run queries over every save under paths in a process pool.
+
+    Pass a WarmSimulationPool (or any pool with imap_unordered) as pool to reuse
+    its workers instead of starting new ones.
+    """
+    query_names = tuple(query_names or QUERIES)
+    for name in query_names:
+        if name not in QUERIES:
+            raise ValueError(f"Unknown query: {name}")
+
+    # Pools consume their input eagerly, so hand out chunks only as results come back
+    max_pending = 4 * (processes or os.cpu_count() or 1)
+    window = threading.Semaphore(max_pending)
+    stopped = False
+
+    def tasks():
+        for chunk in chunked(iter_save_paths(paths), chunk_size):
+            window.acquire()
+            if stopped:
+                return
+            yield chunk, query_names
+
+    total = AnalyticsResult(0, 0, {name: Counter() for name in query_names})
+    new_pool = multiprocessing.Pool(processes) if pool is None else None
+    try:
+        for partial in (pool or new_pool).imap_unordered(_analyze_chunk, tasks()):
+            window.release()
+            total = merge_results(total, partial)
+    finally:
+        # Unblock the task generator if the run ended early
+        stopped = True
+        window.release()
+        if new_pool is not None:
+            new_pool.terminate()
+            new_pool.join()
+    return total
+
+
+def _print_counts(query: SaveQuery, counts: Counter, top: int):
+    print(f"\n=== {query.description} ===")
+    if query.name == "level_by_chapter":
+        chapters: Dict[int, Counter] = {}
+        for (chapter, level), count in counts.items():
+            chapters.setdefault(chapter, Counter())[level] = count
+        for chapter in sorted(chapters):
+            levels = ", ".join(f"L{level}: {count:,}" for level, count in sorted(chapters[chapter].items()))
+            print(f"Chapter {chapter:>3}  {levels}")
+        return
+    for key, count in counts.most_common(top):
+        label = " ".join(str(part) for part in key) if isinstance(key, tuple) else key
+        print(f"{label:<40}{count:>10,}")
+
+
+def main():
+    """Run save analytics from the command line."""
+    parser = argparse.ArgumentParser(description="Aggregate statistics over save archives")
+    parser.add_argument("paths", nargs="+", help="save files or directories to scan")
+    parser.add_argument("--query", action="append", choices=sorted(QUERIES),
+                        help="query to run (repeatable; default: all)")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--top", type=int, default=20, help="entries shown per query")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = analyze_saves(args.paths, args.query, args.processes, args.chunk_size)
+    elapsed = time.perf_counter() - start
+
+    print(f"Analyzed {result.saves:,} saves in {elapsed:.2f}s ({result.errors:,} unreadable)")
+    for name, counts in result.counts.items():
+        _print_counts(QUERIES[name], counts, args.top)
+
+
+if __name__ == "__main__":
+    main()
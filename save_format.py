@@ -0,0 +1,444 @@
+"""
+Save File Format
+
+Save files are compact JSON records, one per line. The file opens with a
+fixed-size header summarizing the latest save (timestamp, chapter, location,
+player name and level), so save lists can read it without decoding the rest.
+Next comes a full snapshot of the game state; each later save appends a delta
+record holding only the fields that changed since the previous save and
+rewrites the header in place. Once enough deltas pile up the file is compacted
+back into a single snapshot.
+
+    {"format": "jjk-save", "version": 4, "type": "header", "timestamp": ..., "chapter": ..., ...}
+    {"format": "jjk-save", "version": 4, "type": "snapshot", "timestamp": ..., "state": {...}}
+    {"type": "delta", "timestamp": ..., "set": {...}, "update": {...}, "remove": {...}}
+
+Version 1 files have no header line and are still read. Since version 3 the
+inventory is saved as item -> quantity instead of a list of repeated items.
+Since version 4 a record's payload (the snapshot state, or a delta's changes)
+may be stored compressed instead, as {"encoding": "zlib", "data": <base64>};
+payloads are compressed only when that makes the record smaller, so small
+deltas stay plain JSON.
+
+"set" replaces whole fields, while "update" and "remove" change individual keys
+of dictionary fields (story flags, relationships, player data), so saves stay
+small as those grow. Records are schema-checked on load; nothing in a save file
+is ever executed, unlike the pickle saves this format replaces. Those legacy
+pickles are still read, with an unpickler that refuses to load any class or
+function, and are rewritten in this format the first time a game loads them.
+
+Snapshots are written to a temporary file, synced and renamed over the save,
+so a crash leaves either the old or the new file. Deltas are appended and
+synced; a record torn by a crash mid-append is dropped on load and the next
+save rewrites the file as a fresh snapshot. The header rewritten in place by
+each delta is only a summary: if it is damaged, the state is rebuilt from the
+snapshot and deltas and the next save rewrites the file the same way.
+"""
+
+import base64
+import io
+import json
+import os
+import pickle
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import lzma
+except ImportError:  # Python builds without liblzma
+    lzma = None
+
+
+SAVE_FORMAT = "jjk-save"
+SAVE_FORMAT_VERSION = 4
+HEADER_SIZE = 512  # Bytes, including the padding and newline
+COMPACT_AFTER_DELTAS = 20  # Rewrite as a single snapshot after this many deltas
+SAVE_COMPRESSION = "zlib"  # Payload compression for new records: "zlib", "lzma" or None
+
+# Encoding -> (compress, decompress)
+_CODECS = {"zlib": (lambda data: zlib.compress(data, 9), zlib.decompress)}
+if lzma is not None:
+    _CODECS["lzma"] = (lzma.compress, lzma.decompress)
+_CODEC_ERRORS = (zlib.error, lzma.LZMAError) if lzma is not None else (zlib.error,)
+
+# Saved game state fields and the JSON types each may hold
+SAVE_SCHEMA: Dict[str, Tuple[type, ...]] = {
+    'player_data': (dict, type(None)),
+    'current_chapter': (int,),
+    'current_location': (str,),
+    'story_flags': (dict,),
+    'relationships': (dict,),
+    'unlocked_techniques': (list,),
+    'completed_missions': (list,),
+    'inventory': (dict, list),  # Lists before version 3
+}
+
+
+class SaveFormatError(ValueError):
+    """A save file is corrupt, from a newer version or not a save file at all."""
+
+
+class SaveContents(NamedTuple):
+    """A save file replayed into its latest state."""
+    state: Dict[str, Any]
+    timestamps: List[str]  # One per record, oldest first
+    deltas: int
+    torn: bool  # The last record was cut short and dropped
+    header: Optional[Dict[str, Any]]  # None for version 1 files
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    """Encode one record as a line of compact JSON."""
+    return (json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _pack(payload: Dict[str, Any], compression: Optional[str]) -> Dict[str, Any]:
+    """Compress a record payload if that makes it smaller."""
+    if compression is None:
+        return payload
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    data = base64.b64encode(_CODECS[compression][0](raw)).decode("ascii")
+    # Allow for the encoding and data keys
+    if len(data) + 32 >= len(raw):
+        return payload
+    return {"encoding": compression, "data": data}
+
+
+def _unpack(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Get a record's payload, decompressing it if needed."""
+    encoding = record.get("encoding")
+    if encoding is None:
+        return record
+    if encoding not in _CODECS:
+        raise SaveFormatError(f"Unsupported save encoding {encoding}")
+    try:
+        payload = json.loads(_CODECS[encoding][1](base64.b64decode(record["data"])))
+    except (KeyError, TypeError, ValueError) + _CODEC_ERRORS as e:
+        raise SaveFormatError(f"Compressed save record is corrupt: {e}")
+    if not isinstance(payload, dict):
+        raise SaveFormatError("Compressed save record is not an object")
+    return payload
+
+
+def write_atomic(path: str, data: bytes):
+    """Replace a file with data so readers and crashes see either the old or the new file."""
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+    # Persist the rename itself; directories cannot be opened on Windows
+    try:
+        directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(directory)
+    except OSError:
+        pass
+    finally:
+        os.close(directory)
+
+
+def save_header(state: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+    """Summarize a saved state for the file header."""
+    player_data = state.get('player_data') or {}
+    return {
+        "format": SAVE_FORMAT,
+        "version": SAVE_FORMAT_VERSION,
+        "type": "header",
+        "timestamp": timestamp,
+        "chapter": state.get('current_chapter', 1),
+        "location": state.get('current_location', 'Unknown'),
+        "player_name": player_data.get('name', 'Unknown'),
+        "level": player_data.get('level', 1),
+    }
+
+
+def _encode_header(header: Dict[str, Any]) -> bytes:
+    """Encode a header padded to exactly HEADER_SIZE bytes."""
+    header = dict(header)
+    data = _encode(header)
+    # Shorten the free-text fields until the header fits
+    while len(data) > HEADER_SIZE:
+        header["player_name"] = header["player_name"][:-4]
+        header["location"] = header["location"][:-4]
+        data = _encode(header)
+    return data[:-1] + b" " * (HEADER_SIZE - len(data)) + b"\n"
+
+
+def read_header(path: str) -> Optional[Dict[str, Any]]:
+    """Read just the header of a save file, or None if it has none."""
+    with open(path, "rb") as f:
+        data = f.read(HEADER_SIZE)
+    if len(data) < HEADER_SIZE or not data.endswith(b"\n"):
+        return None
+    try:
+        header = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(header, dict) or header.get("type") != "header" or header.get("format") != SAVE_FORMAT:
+        return None
+    return header
+
+
+def normalize_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a state through JSON so it compares equal to what a load would return."""
+    return json.loads(json.dumps(state))
+
+
+def inventory_counts(inventory: Any) -> Counter:
+    """Item quantities from a saved inventory, in either the stacked or the old list form."""
+    if isinstance(inventory, dict):
+        return Counter({item: quantity for item, quantity in inventory.items() if quantity > 0})
+    return Counter(inventory)
+
+
+def validate_state(state: Any):
+    """Check that a state has every schema field with an allowed type."""
+    if not isinstance(state, dict):
+        raise SaveFormatError("Save state must be an object")
+    for field, types in SAVE_SCHEMA.items():
+        if field not in state:
+            raise SaveFormatError(f"Save state is missing {field}")
+        value = state[field]
+        # bool is an int subclass, but never a valid chapter
+        if not isinstance(value, types) or isinstance(value, bool):
+            raise SaveFormatError(f"Save field {field} has invalid type {type(value).__name__}")
+
+
+def diff_state(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Describe the changes from old to new; empty if nothing changed."""
+    delta: Dict[str, Any] = {}
+    for field, value in new.items():
+        previous = old.get(field)
+        if previous == value:
+            continue
+        if isinstance(previous, dict) and isinstance(value, dict):
+            changed = {key: item for key, item in value.items()
+                       if key not in previous or previous[key] != item}
+            removed = [key for key in previous if key not in value]
+            if changed:
+                delta.setdefault("update", {})[field] = changed
+            if removed:
+                delta.setdefault("remove", {})[field] = removed
+        else:
+            delta.setdefault("set", {})[field] = value
+    return delta
+
+
+def apply_delta(state: Dict[str, Any], delta: Dict[str, Any]):
+    """Apply a delta record to a state in place."""
+    try:
+        for field, value in delta.get("set", {}).items():
+            state[field] = value
+        for field, changed in delta.get("update", {}).items():
+            state[field].update(changed)
+        for field, removed in delta.get("remove", {}).items():
+            for key in removed:
+                state[field].pop(key, None)
+    except (AttributeError, KeyError, TypeError) as e:
+        raise SaveFormatError(f"Delta record does not match the saved state: {e}")
+
+
+def _is_save_record(line: bytes) -> bool:
+    """Check whether a line holds an intact record that opens a save file."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return False
+    return isinstance(record, dict) and record.get("format") == SAVE_FORMAT
+
+
+class _PlainDataUnpickler(pickle.Unpickler):
+    """Unpickler for legacy saves, which hold only dicts, lists, strings and numbers."""
+
+    def find_class(self, module: str, name: str):
+        # Loading any class or function is how a pickle runs code: never allow it
+        raise SaveFormatError(f"Legacy save refers to {module}.{name}; only plain data is loaded")
+
+
+def _read_legacy_save(data: bytes) -> SaveContents:
+    """Read a pickle save from before this format, without running anything in it."""
+    try:
+        save_data = _PlainDataUnpickler(io.BytesIO(data)).load()
+    except SaveFormatError:
+        raise
+    except Exception as e:
+        raise SaveFormatError(f"Unreadable legacy save: {e}")
+    if not isinstance(save_data, dict):
+        raise SaveFormatError("Legacy save is not a saved game")
+
+    state = {
+        'player_data': save_data.get('player_data'),
+        'current_chapter': save_data.get('current_chapter', 1),
+        'current_location': save_data.get('current_location', "Tokyo Jujutsu High"),
+        'story_flags': save_data.get('story_flags', {}),
+        'relationships': save_data.get('relationships', {}),
+        'unlocked_techniques': list(save_data.get('unlocked_techniques', [])),
+        'completed_missions': list(save_data.get('completed_missions', [])),
+        'inventory': save_data.get('inventory', []),
+    }
+    validate_state(state)
+    state['inventory'] = dict(inventory_counts(state['inventory']))
+    return SaveContents(state, [str(save_data.get('timestamp', 'Unknown'))], 0, False, None)
+
+
+def is_legacy_save(path: str) -> bool:
+    """Check whether a file is a pickle save from before this format."""
+    with open(path, "rb") as f:
+        return f.read(1) == b"\x80"
+
+
+def migrate_legacy_save(path: str) -> bool:
+    """Rewrite a legacy pickle save in this format. Returns False if it was not one."""
+    if not is_legacy_save(path):
+        return False
+    with open(path, "rb") as f:
+        data = f.read()
+    contents = _read_legacy_save(data)
+    # Keep the original until the player has moved on; nothing ever loads it again
+    write_atomic(path + ".pickle-backup", data)
+    SaveLog(path).write(contents.state, contents.timestamps[-1])
+    return True
+
+
+def read_save(path: str) -> SaveContents:
+    """Read a save file and replay its deltas."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(b"\x80"):
+        return _read_legacy_save(data)
+
+    # Deltas rewrite the fixed-size header in place; if a crash tore that rewrite, drop
+    # the header and rebuild from the snapshot and deltas, which the rewrite never touches
+    header_damaged = (data[HEADER_SIZE - 1:HEADER_SIZE] == b"\n"
+                      and not _is_save_record(data[:HEADER_SIZE])
+                      and _is_save_record(data[HEADER_SIZE:].split(b"\n", 1)[0]))
+    if header_damaged:
+        data = data[HEADER_SIZE:]
+    lines = data.splitlines()
+
+    # Every complete record ends in a newline; anything after the last one is a torn append
+    torn = bool(data) and not data.endswith(b"\n")
+    if torn:
+        lines.pop()
+
+    try:
+        records = [json.loads(line) for line in lines if line.strip()]
+    except ValueError as e:
+        raise SaveFormatError(f"Not a save file: {e}")
+    if not records or not isinstance(records[0], dict) or records[0].get("format") != SAVE_FORMAT:
+        raise SaveFormatError("Not a save file")
+
+    first = records[0]
+    if not isinstance(first.get("version"), int) or first["version"] > SAVE_FORMAT_VERSION:
+        raise SaveFormatError(f"Save version {first.get('version')} is newer than supported "
+                              f"({SAVE_FORMAT_VERSION})")
+    header = None
+    if first.get("type") == "header":
+        header = records.pop(0)
+    if not records or not isinstance(records[0], dict) or records[0].get("type") != "snapshot":
+        raise SaveFormatError("Save file does not start with a snapshot")
+
+    snapshot = records[0]
+    state = _unpack(snapshot).get("state")
+    validate_state(state)
+    timestamps = [snapshot.get("timestamp", "Unknown")]
+    for record in records[1:]:
+        if not isinstance(record, dict) or record.get("type") != "delta":
+            raise SaveFormatError("Expected a delta record")
+        apply_delta(state, _unpack(record))
+        timestamps.append(record.get("timestamp", "Unknown"))
+    validate_state(state)
+
+    # A damaged header is reported as torn so the next save rewrites the whole file
+    return SaveContents(state, timestamps, len(records) - 1, torn or header_damaged, header)
+
+
+class SaveLog:
+    """Writes a save file as a snapshot followed by delta records."""
+
+    def __init__(self, path: str, compact_after: int = COMPACT_AFTER_DELTAS,
+                 compression: Optional[str] = SAVE_COMPRESSION):
+        if compression is not None and compression not in _CODECS:
+            raise ValueError(f"Unsupported save compression: {compression}")
+        self.path = path
+        self.compact_after = compact_after
+        self.compression = compression
+        self._saved: Optional[Dict[str, Any]] = None  # State as of the last record written
+        self.deltas = 0
+        self.last_header: Optional[Dict[str, Any]] = None
+
+    def load(self) -> Tuple[Dict[str, Any], str]:
+        """Read the save file and remember it as the base for later deltas."""
+        migrate_legacy_save(self.path)
+        contents = read_save(self.path)
+        self._saved = normalize_state(contents.state)
+        # After a torn append, rewrite the file instead of appending past the garbage;
+        # version 1 files are rewritten to gain a header
+        if contents.torn or contents.header is None:
+            self.deltas = self.compact_after
+        else:
+            self.deltas = contents.deltas
+        self.last_header = contents.header
+        return contents.state, contents.timestamps[-1]
+
+    def write(self, state: Dict[str, Any], timestamp: str) -> str:
+        """Save a state, appending a delta when possible. Returns "snapshot", "delta" or "unchanged"."""
+        state = normalize_state(state)
+        validate_state(state)
+
+        if self._saved is None or self.deltas >= self.compact_after or not os.path.exists(self.path):
+            self._write_snapshot(state, timestamp)
+            return "snapshot"
+
+        delta = diff_state(self._saved, state)
+        if not delta:
+            return "unchanged"
+
+        header = save_header(state, timestamp)
+        with open(self.path, "r+b") as f:
+            previous_header = f.read(HEADER_SIZE)
+            size = f.seek(0, os.SEEK_END)
+            try:
+                f.write(_encode({"type": "delta", "timestamp": timestamp,
+                                 **_pack(delta, self.compression)}))
+                f.seek(0)
+                f.write(_encode_header(header))
+                f.flush()
+                os.fsync(f.fileno())
+            except BaseException:
+                # Never append onto a partial record: put the file back as it was if
+                # we can, and make the next save an atomic snapshot either way
+                self.deltas = self.compact_after
+                try:
+                    f.truncate(size)
+                    f.seek(0)
+                    f.write(previous_header)
+                    f.flush()
+                except OSError:
+                    pass
+                raise
+        self._saved = state
+        self.last_header = header
+        self.deltas += 1
+        return "delta"
+
+    def compact(self, timestamp: str):
+        """Rewrite the save file as a single snapshot of the current saved state."""
+        if self._saved is not None:
+            self._write_snapshot(self._saved, timestamp)
+
+    def _write_snapshot(self, state: Dict[str, Any], timestamp: str):
+        header = save_header(state, timestamp)
+        write_atomic(self.path, _encode_header(header) +
+                     _encode({"format": SAVE_FORMAT, "version": SAVE_FORMAT_VERSION,
+                              "type": "snapshot", "timestamp": timestamp,
+                              **_pack({"state": state}, self.compression)}))
+        self._saved = state
+        self.last_header = header
+        self.deltas = 0
@@ -0,0 +1,166 @@
+"""
+Save Slots
+
+Numbered save slots in a saves directory, plus an index file caching each
+slot's header. Listing slots reads the index and checks every slot file's size
+and modification time; only slots changed behind the index's back have their
+header read, and no save body is ever decoded.
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from save_format import (SaveFormatError, migrate_legacy_save, read_header, read_save, save_header,
+                         write_atomic)
+
+
+SAVE_DIRECTORY = "saves"
+LEGACY_SAVE_FILE = "jjk_save.dat"  # The single save file used before slots
+SLOT_INDEX_FILE = "index.json"
+SLOT_INDEX_VERSION = 1
+_SLOT_FILE = re.compile(r"^slot_(\d+)\.sav$")
+
+
+class SlotInfo(NamedTuple):
+    """Summary of a save slot for the load screen."""
+    slot: int
+    timestamp: str
+    chapter: int
+    location: str
+    player_name: str
+    level: int
+
+
+def _slot_info(slot: int, header: Dict[str, Any]) -> SlotInfo:
+    return SlotInfo(slot, header.get("timestamp", "Unknown"), header.get("chapter", 1),
+                    header.get("location", "Unknown"), header.get("player_name", "Unknown"),
+                    header.get("level", 1))
+
+
+class SaveSlots:
+    """Save slot files and their index in one directory."""
+
+    def __init__(self, directory: str = SAVE_DIRECTORY):
+        self.directory = directory
+        self.index_path = os.path.join(directory, SLOT_INDEX_FILE)
+        self._lock = threading.Lock()  # Saves update the index from the writer thread
+
+    def slot_path(self, slot: int) -> str:
+        """Path of a slot's save file."""
+        return os.path.join(self.directory, f"slot_{slot:02d}.sav")
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index, dict) or index.get("version") != SLOT_INDEX_VERSION:
+            return {}
+        return index.get("slots", {})
+
+    def _write_index(self, entries: Dict[str, Dict[str, Any]]):
+        os.makedirs(self.directory, exist_ok=True)
+        data = json.dumps({"version": SLOT_INDEX_VERSION, "slots": entries},
+                          separators=(",", ":"), sort_keys=True)
+        write_atomic(self.index_path, data.encode("utf-8"))
+
+    def record_save(self, slot: int, header: Dict[str, Any]):
+        """Update a slot's index entry after its save file was written."""
+        with self._lock:
+            stat = os.stat(self.slot_path(slot))
+            entries = self._read_index()
+            entries[str(slot)] = dict(header, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            self._write_index(entries)
+
+    def list_slots(self) -> List[SlotInfo]:
+        """List every slot with a save, refreshing index entries that are out of date."""
+        with self._lock:
+            entries = self._read_index()
+            current = {}
+            changed = False
+
+            try:
+                files = list(os.scandir(self.directory))
+            except OSError:
+                files = []
+
+            for entry in files:
+                match = _SLOT_FILE.match(entry.name)
+                if not match:
+                    continue
+                key = str(int(match.group(1)))
+                stat = entry.stat()
+                cached = entries.get(key)
+                if cached and cached.get("size") == stat.st_size and cached.get("mtime_ns") == stat.st_mtime_ns:
+                    current[key] = cached
+                    continue
+
+                header = self._load_header(entry.path)
+                changed = True
+                if header is not None:
+                    current[key] = dict(header, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+            if changed or current.keys() != entries.keys():
+                self._write_index(current)
+
+        return sorted((_slot_info(int(key), header) for key, header in current.items()),
+                      key=lambda info: info.slot)
+
+    def _load_header(self, path: str) -> Optional[Dict[str, Any]]:
+        """Read a slot's header, falling back to a full read for version 1 files."""
+        try:
+            header = read_header(path)
+            if header is None:
+                contents = read_save(path)
+                header = save_header(contents.state, contents.timestamps[-1])
+            return header
+        except (OSError, SaveFormatError):
+            return None  # Unreadable slots are left out of the list
+
+    def get_slot(self, slot: int) -> Optional[SlotInfo]:
+        """Get a single slot's summary from its header."""
+        header = self._load_header(self.slot_path(slot)) if os.path.exists(self.slot_path(slot)) else None
+        return _slot_info(slot, header) if header else None
+
+    def next_free_slot(self) -> int:
+        """Lowest slot number without a save."""
+        used = {info.slot for info in self.list_slots()}
+        slot = 1
+        while slot in used or os.path.exists(self.slot_path(slot)):
+            slot += 1
+        return slot
+
+    def import_legacy_save(self, path: str = LEGACY_SAVE_FILE) -> Optional[int]:
+        """Move a save from before slots into the lowest free slot. Returns the slot, or None."""
+        if not os.path.exists(path):
+            return None
+        try:
+            # Pickle saves are rewritten in the current format first
+            migrate_legacy_save(path)
+        except (OSError, SaveFormatError):
+            return None
+        header = self._load_header(path)
+        if header is None:
+            return None  # Unreadable: leave it where it is
+
+        slot = self.next_free_slot()
+        os.makedirs(self.directory, exist_ok=True)
+        os.replace(path, self.slot_path(slot))
+        self.record_save(slot, header)
+        return slot
+    
+    def delete_slot(self, slot: int) -> bool:
+        """Delete a slot's save file and index entry."""
+        path = self.slot_path(slot)
+        if not os.path.exists(path):
+            return False
+        os.remove(path)
+        with self._lock:
+            entries = self._read_index()
+            if entries.pop(str(slot), None) is not None:
+                self._write_index(entries)
+        return True
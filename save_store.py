@@ -0,0 +1,405 @@
+"""
+SQLite Profile Store
+
+Keeps many players' saves in a single SQLite database in WAL mode, one profile
+per player. Each profile's state is split into normalized tables (player,
+traits, techniques, relationships, flags, inventory and unlocks). A save reads
+the profile's current rows inside its write transaction and writes only the
+rows that differ, so no rows are cached between saves and several processes
+can share the database. Profiles are indexed by level, chapter and last-played time for
+hosted listings and queries.
+"""
+
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from save_format import inventory_counts, normalize_state, validate_state
+
+
+STORE_SCHEMA_VERSION = 2
+
+_TECHNIQUES_TABLE = """
+CREATE TABLE IF NOT EXISTS techniques (
+    profile_id TEXT NOT NULL REFERENCES players ON DELETE CASCADE,
+    technique TEXT NOT NULL,  -- Catalog id, or the name of an inline definition
+    position INTEGER NOT NULL,
+    current_cooldown INTEGER NOT NULL,
+    uses INTEGER NOT NULL,
+    definition TEXT,  -- JSON, only for techniques missing from the catalog
+    PRIMARY KEY (profile_id, technique)
+) WITHOUT ROWID;
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    profile_id TEXT PRIMARY KEY,
+    has_player INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    experience INTEGER NOT NULL,
+    hp INTEGER NOT NULL,
+    max_hp INTEGER NOT NULL,
+    cursed_energy INTEGER NOT NULL,
+    max_cursed_energy INTEGER NOT NULL,
+    transformation_active INTEGER NOT NULL,
+    transformation_name TEXT NOT NULL,
+    transformation_turns INTEGER NOT NULL,
+    chapter INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    last_played TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_level ON players (level);
+CREATE INDEX IF NOT EXISTS players_chapter ON players (chapter);
+CREATE INDEX IF NOT EXISTS players_last_played ON players (last_played);
+
+CREATE TABLE IF NOT EXISTS traits (
+    profile_id TEXT NOT NULL REFERENCES players ON DELETE CASCADE,
+    trait TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (profile_id, trait)
+) WITHOUT ROWID;
+""" + _TECHNIQUES_TABLE + """
+CREATE TABLE IF NOT EXISTS relationships (
+    profile_id TEXT NOT NULL REFERENCES players ON DELETE CASCADE,
+    owner TEXT NOT NULL,  -- 'game' or 'player'
+    npc TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (profile_id, owner, npc)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS flags (
+    profile_id TEXT NOT NULL REFERENCES players ON DELETE CASCADE,
+    flag TEXT NOT NULL,
+    value TEXT NOT NULL,  -- JSON
+    PRIMARY KEY (profile_id, flag)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS inventory (
+    profile_id TEXT NOT NULL REFERENCES players ON DELETE CASCADE,
+    item TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (profile_id, item)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS unlocks (
+    profile_id TEXT NOT NULL REFERENCES players ON DELETE CASCADE,
+    kind TEXT NOT NULL,  -- 'technique' or 'mission'
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (profile_id, kind, name)
+) WITHOUT ROWID;
+"""
+
+# Table -> (key columns after profile_id, value columns)
+_TABLES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "players": ((), ("has_player", "name", "level", "experience", "hp", "max_hp",
+                     "cursed_energy", "max_cursed_energy", "transformation_active",
+                     "transformation_name", "transformation_turns", "chapter", "location")),
+    "traits": (("trait",), ("value",)),
+    "techniques": (("technique",), ("position", "current_cooldown", "uses", "definition")),
+    "relationships": (("owner", "npc"), ("value",)),
+    "flags": (("flag",), ("value",)),
+    "inventory": (("item",), ("quantity", "position")),
+    "unlocks": (("kind", "name"), ("position",)),
+}
+
+Rows = Dict[str, Dict[tuple, tuple]]  # Table -> key -> values
+
+
+class ProfileInfo(NamedTuple):
+    """Summary of a stored profile."""
+    profile_id: str
+    player_name: str
+    level: int
+    chapter: int
+    location: str
+    last_played: str
+
+
+def _state_rows(state: Dict[str, Any]) -> Rows:
+    """Split a save state into table rows."""
+    player = state['player_data']
+    rows: Rows = {table: {} for table in _TABLES}
+
+    rows["players"][()] = (
+        1 if player else 0,
+        player['name'] if player else "",
+        player['level'] if player else 1,
+        player['experience'] if player else 0,
+        player['hp'] if player else 0,
+        player['max_hp'] if player else 0,
+        player['cursed_energy'] if player else 0,
+        player['max_cursed_energy'] if player else 0,
+        int(bool(player['transformation_active'])) if player else 0,
+        player['transformation_name'] if player else "",
+        player['transformation_turns'] if player else 0,
+        state['current_chapter'],
+        state['current_location'],
+    )
+
+    if player:
+        for trait, value in player['traits'].items():
+            rows["traits"][(trait,)] = (value,)
+        for position, technique in enumerate(player['techniques']):
+            definition = technique.get('definition')
+            key = technique['id'] if definition is None else definition['name']
+            rows["techniques"][(key,)] = (
+                position, technique['current_cooldown'], technique['uses'],
+                None if definition is None else json.dumps(definition, separators=(",", ":")))
+        for npc, value in player['relationships'].items():
+            rows["relationships"][("player", npc)] = (value,)
+
+    for npc, value in state['relationships'].items():
+        rows["relationships"][("game", npc)] = (value,)
+    for flag, value in state['story_flags'].items():
+        rows["flags"][(flag,)] = (json.dumps(value, separators=(",", ":")),)
+
+    for position, (item, quantity) in enumerate(inventory_counts(state['inventory']).items()):
+        rows["inventory"][(item,)] = (quantity, position)
+
+    for kind, field in (("technique", 'unlocked_techniques'), ("mission", 'completed_missions')):
+        for position, name in enumerate(state[field]):
+            rows["unlocks"].setdefault((kind, name), (position,))
+
+    return rows
+
+
+def _rows_state(rows: Rows) -> Dict[str, Any]:
+    """Rebuild a save state from table rows."""
+    (has_player, name, level, experience, hp, max_hp, cursed_energy, max_cursed_energy,
+     transformation_active, transformation_name, transformation_turns,
+     chapter, location) = rows["players"][()]
+
+    relationships = {"game": {}, "player": {}}
+    for (owner, npc), (value,) in rows["relationships"].items():
+        relationships[owner][npc] = value
+
+    player = None
+    if has_player:
+        techniques = sorted(rows["techniques"].items(), key=lambda item: item[1][0])
+        player = {
+            'name': name,
+            'max_hp': max_hp,
+            'hp': hp,
+            'max_cursed_energy': max_cursed_energy,
+            'cursed_energy': cursed_energy,
+            'level': level,
+            'experience': experience,
+            'traits': {trait: value for (trait,), (value,) in rows["traits"].items()},
+            'relationships': relationships["player"],
+            'transformation_active': bool(transformation_active),
+            'transformation_name': transformation_name,
+            'transformation_turns': transformation_turns,
+            'techniques': [
+                dict({'id': key} if definition is None else {'definition': json.loads(definition)},
+                     current_cooldown=current_cooldown, uses=uses)
+                for (key,), (_, current_cooldown, uses, definition) in techniques
+            ],
+        }
+
+    inventory = {item: quantity for (item,), (quantity, _)
+                 in sorted(rows["inventory"].items(), key=lambda entry: entry[1][1])}
+
+    unlocks = {"technique": [], "mission": []}
+    for (kind, unlock), (position,) in sorted(rows["unlocks"].items(), key=lambda entry: entry[1][0]):
+        unlocks[kind].append(unlock)
+
+    return {
+        'player_data': player,
+        'current_chapter': chapter,
+        'current_location': location,
+        'story_flags': {flag: json.loads(value) for (flag,), (value,) in rows["flags"].items()},
+        'relationships': relationships["game"],
+        'unlocked_techniques': unlocks["technique"],
+        'completed_missions': unlocks["mission"],
+        'inventory': inventory,
+    }
+
+
+def _diff_statements(profile_id: str, old_rows: Rows, new_rows: Rows,
+                     timestamp: str) -> List[Tuple[str, tuple]]:
+    """SQL statements that turn a profile's old rows into its new rows; empty if none differ."""
+    statements: List[Tuple[str, tuple]] = []
+    for table, (keys, values) in _TABLES.items():
+        old, new = old_rows[table], new_rows[table]
+        key_columns = ("profile_id",) + keys
+        changed = [(key, row) for key, row in new.items() if old.get(key) != row]
+        if changed:
+            columns = key_columns + values
+            if table == "players":
+                columns += ("last_played",)
+            updates = ", ".join(f"{column} = excluded.{column}"
+                                for column in columns[len(key_columns):])
+            sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+                   f"VALUES ({', '.join('?' * len(columns))}) "
+                   f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}")
+            for key, row in changed:
+                extra = (timestamp,) if table == "players" else ()
+                statements.append((sql, (profile_id,) + key + row + extra))
+
+        removed = [key for key in old if key not in new]
+        if removed:
+            where = " AND ".join(f"{column} = ?" for column in key_columns)
+            sql = f"DELETE FROM {table} WHERE {where}"
+            statements.extend((sql, (profile_id,) + key) for key in removed)
+
+    if statements and not any(sql.startswith("INSERT INTO players ") for sql, _ in statements):
+        # Other rows changed: still record when the profile was played
+        statements.insert(0, ("UPDATE players SET last_played = ? WHERE profile_id = ?",
+                              (timestamp, profile_id)))
+    return statements
+
+
+class SQLiteSaveStore:
+    """Multi-profile save store in one SQLite database."""
+
+    def __init__(self, path: str = "jjk_profiles.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        # Shared by the game thread and the background save writer, under _lock
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version > STORE_SCHEMA_VERSION:
+            raise sqlite3.DatabaseError(f"Save store schema {version} is newer than supported "
+                                        f"({STORE_SCHEMA_VERSION})")
+        if version == 1:
+            self._migrate_techniques()
+        self.connection.executescript(_SCHEMA)
+        self.connection.execute(f"PRAGMA user_version={STORE_SCHEMA_VERSION}")
+
+    def _migrate_techniques(self):
+        """Convert schema 1 technique rows, which copied each definition, to inline definitions.
+
+        Player.from_dict resolves inline definitions that match the catalog, so the
+        next save of each profile replaces them with catalog ids.
+        """
+        fields = ("name", "damage", "cost", "description", "technique_type", "cooldown")
+        with self.connection:
+            self.connection.execute("BEGIN")
+            old_rows = self.connection.execute(
+                f"SELECT profile_id, position, current_cooldown, {', '.join(fields)} FROM techniques"
+            ).fetchall()
+            self.connection.execute("DROP TABLE techniques")
+            self.connection.execute(_TECHNIQUES_TABLE)
+            self.connection.executemany(
+                "INSERT INTO techniques (profile_id, technique, position, current_cooldown, uses, "
+                "definition) VALUES (?, ?, ?, ?, 0, ?)",
+                [(profile_id, row[0], position, current_cooldown,
+                  json.dumps(dict(zip(fields, row)), separators=(",", ":")))
+                 for profile_id, position, current_cooldown, *row in old_rows])
+
+    def _read_rows(self, profile_id: str) -> Optional[Rows]:
+        """Read a profile's rows from the database, or None if it does not exist."""
+        rows: Rows = {}
+        for table, (keys, values) in _TABLES.items():
+            columns = ", ".join(keys + values)
+            cursor = self.connection.execute(
+                f"SELECT {columns} FROM {table} WHERE profile_id = ?", (profile_id,))
+            rows[table] = {tuple(row[:len(keys)]): tuple(row[len(keys):]) for row in cursor}
+        if not rows["players"]:
+            return None
+        return rows
+
+    def save_profile(self, profile_id: str, state: Dict[str, Any], timestamp: str) -> str:
+        """Save a profile's state, writing only changed rows. Returns "saved" or "unchanged"."""
+        state = normalize_state(state)
+        validate_state(state)
+        new_rows = _state_rows(state)
+
+        with self._lock:
+            with self.connection:
+                # Take the write lock before reading, so the diff is against the rows as
+                # they are now, even when other processes write the same database
+                self.connection.execute("BEGIN IMMEDIATE")
+                old_rows = self._read_rows(profile_id) or {table: {} for table in _TABLES}
+                statements = _diff_statements(profile_id, old_rows, new_rows, timestamp)
+                for sql, parameters in statements:
+                    self.connection.execute(sql, parameters)
+            return "saved" if statements else "unchanged"
+
+    def load_profile(self, profile_id: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Load a profile's state and last-played time, or None if it does not exist."""
+        with self._lock:
+            self.connection.execute("BEGIN")
+            try:
+                rows = self._read_rows(profile_id)
+                last_played = self.connection.execute(
+                    "SELECT last_played FROM players WHERE profile_id = ?", (profile_id,)).fetchone()
+            finally:
+                self.connection.execute("COMMIT")
+        if rows is None:
+            return None
+        return _rows_state(rows), last_played[0]
+
+    def has_profile(self, profile_id: str) -> bool:
+        """Check whether a profile exists."""
+        with self._lock:
+            return self.connection.execute(
+                "SELECT 1 FROM players WHERE profile_id = ?", (profile_id,)).fetchone() is not None
+
+    def delete_profile(self, profile_id: str) -> bool:
+        """Delete a profile and all of its rows."""
+        with self._lock:
+            with self.connection:
+                self.connection.execute("BEGIN")
+                cursor = self.connection.execute("DELETE FROM players WHERE profile_id = ?", (profile_id,))
+            return cursor.rowcount > 0
+
+    def list_profiles(self, min_level: Optional[int] = None, chapter: Optional[int] = None,
+                      limit: int = 100) -> List[ProfileInfo]:
+        """List profiles, most recently played first, optionally filtered by level and chapter."""
+        conditions, parameters = [], []
+        if min_level is not None:
+            conditions.append("level >= ?")
+            parameters.append(min_level)
+        if chapter is not None:
+            conditions.append("chapter = ?")
+            parameters.append(chapter)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            cursor = self.connection.execute(
+                f"SELECT profile_id, name, level, chapter, location, last_played FROM players "
+                f"{where} ORDER BY last_played DESC LIMIT ?", parameters + [limit])
+            return [ProfileInfo(*row) for row in cursor]
+
+    def get_profile_info(self, profile_id: str) -> Optional[ProfileInfo]:
+        """Get one profile's summary."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT profile_id, name, level, chapter, location, last_played FROM players "
+                "WHERE profile_id = ?", (profile_id,)).fetchone()
+        return ProfileInfo(*row) if row else None
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self.connection.close()
+
+
+class ProfileSaveLog:
+    """Saves one profile of a SQLiteSaveStore; stands in for SaveLog in the save writer."""
+
+    def __init__(self, store: SQLiteSaveStore, profile_id: str):
+        self.store = store
+        self.profile_id = profile_id
+        self.path = f"{store.path}#{profile_id}"
+        self.last_header = None
+
+    def load(self) -> Tuple[Dict[str, Any], str]:
+        """Load the profile's state and last-played time."""
+        loaded = self.store.load_profile(self.profile_id)
+        if loaded is None:
+            raise KeyError(f"No saved profile {self.profile_id}")
+        return loaded
+
+    def write(self, state: Dict[str, Any], timestamp: str) -> str:
+        """Save the profile's state."""
+        return self.store.save_profile(self.profile_id, state, timestamp)
@@ -0,0 +1,206 @@
+"""
+Combat Simulation System
+
+Runs headless fights between player builds and enemies for balance studies,
+reusing the rules of the turn-based combat system without any input or output.
+"""
+
+import contextlib
+import os
+import random
+from typing import Callable, Dict, List, Optional
+
+from character import Player, Enemy, Trait, XP_PER_LEVEL
+from combat import CombatSystem, CombatAction
+from enemies import get_enemy_pool, get_enemy_registry
+
+
+# Enemy types declared in the enemy registry
+ENEMY_TYPES = list(get_enemy_registry().templates)
+
+MAX_LEVEL = 30
+MAX_TURNS = 50  # Fights that run longer than this count as losses
+
+PLAYER_BUILDS: Dict[str, Callable[[int], Player]] = {}
+
+
+def register_build(name: str):
+    """Register a player build factory that takes a level and returns a Player."""
+    def decorator(factory: Callable[[int], Player]) -> Callable[[int], Player]:
+        PLAYER_BUILDS[name] = factory
+        return factory
+    return decorator
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the game's console output for the duration of the block."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def level_player(player: Player, level: int) -> Player:
+    """Bring a freshly created player up to the given level."""
+    if level > player.level:
+        player.gain_experience((level - 1) * XP_PER_LEVEL - player.experience, announce=False)
+    return player
+
+
+def _trait_build(name: str, traits: Dict[Trait, int]) -> Callable[[int], Player]:
+    """Create a build factory that applies fixed trait values."""
+    def factory(level: int) -> Player:
+        player = Player(name)
+        for trait, value in traits.items():
+            player.modify_trait(trait, value)
+        return level_player(player, level)
+    return factory
+
+
+register_build("balanced")(_trait_build("Balanced Sorcerer", {}))
+register_build("focused")(_trait_build("Focused Sorcerer",
+                                       {Trait.FOCUSED: 70, Trait.CAUTIOUS: 60}))
+register_build("aggressive")(_trait_build("Aggressive Sorcerer",
+                                          {Trait.AGGRESSIVE: 70, Trait.RECKLESS: 60}))
+register_build("compassionate")(_trait_build("Compassionate Sorcerer",
+                                             {Trait.COMPASSIONATE: 70, Trait.PROTECTIVE: 60}))
+
+
+def create_build(build_name: str, level: int) -> Player:
+    """Create a registered player build at the given level."""
+    if build_name not in PLAYER_BUILDS:
+        raise KeyError(f"Unknown player build: {build_name}")
+    return PLAYER_BUILDS[build_name](level)
+
+
+# Content catalogs shared by every simulation in this process. They are only
+# ever read, so a warm worker pool builds them once and forked workers inherit them.
+_story_manager = None
+
+
+def shared_story_manager():
+    """Get the story manager used to create enemies in this process."""
+    global _story_manager
+    if _story_manager is None:
+        from story import StoryManager
+        _story_manager = StoryManager()
+    return _story_manager
+
+
+def shared_technique_library():
+    """Get the technique library used to build loadouts in this process."""
+    from cursed_techniques import get_technique_library
+    return get_technique_library()
+
+
+def shared_npc_manager():
+    """Get the NPC manager used by simulations in this process."""
+    from npcs import get_npc_manager
+    return get_npc_manager()
+
+
+def preload_catalogs():
+    """Build every shared content catalog so later simulations never pay for it."""
+    from story import get_difficulty_table
+    get_difficulty_table()
+    shared_story_manager()
+    shared_technique_library()
+    shared_npc_manager()
+    get_enemy_pool()
+
+
+def create_enemy(enemy_type: str, player_level: int) -> Enemy:
+    """Get a pooled enemy exactly as the story would create it for a player of this level."""
+    return shared_story_manager()._create_enemy(enemy_type, player_level)
+
+
+def create_base_enemy(enemy_type: str) -> Enemy:
+    """Get a pooled enemy of the given type before any level scaling."""
+    return get_enemy_pool().acquire(enemy_type)
+
+
+def release_enemy(enemy: Enemy):
+    """Return an enemy to the pool once its fight is over."""
+    get_enemy_pool().release(enemy)
+
+
+class SimulatedCombat(CombatSystem):
+    """Combat system that plays the player's side with a simple policy."""
+
+    def __init__(self, max_turns: int = MAX_TURNS):
+        super().__init__()
+        self.max_turns = max_turns
+
+    def choose_player_action(self, player: Player, actions: List[CombatAction]) -> CombatAction:
+        """Pick the player's action: transform when possible, else the strongest attack."""
+        best = None
+        for action in actions:
+            if action.action_type == "transform":
+                return action
+            if action.action_type == "technique" and action.technique.technique_type == "offensive":
+                if best is None or action.technique.damage > best.technique.damage:
+                    best = action
+
+        if best is not None:
+            return best
+        return next(a for a in actions if a.action_type == "attack")
+
+    def player_turn(self, player: Player, enemy: Enemy) -> bool:
+        """Handle the player's turn without prompting for input."""
+        actions = self.get_player_actions(player)
+        self.execute_player_action(player, enemy, self.choose_player_action(player, actions))
+        return True
+
+    def run(self, player: Player, enemy: Enemy) -> bool:
+        """Fight to the end without rewards. Returns True if the player wins."""
+        self.turn_count = 0
+        self.combat_log = []
+        self.player_dodge_ready = False
+        self.enemy_dodge_ready = False
+
+        while player.is_alive() and enemy.is_alive() and self.turn_count < self.max_turns:
+            self.turn_count += 1
+
+            self.player_turn(player, enemy)
+            if not enemy.is_alive():
+                break
+
+            self.enemy_turn(enemy, player)
+            if not player.is_alive():
+                break
+
+            self.process_turn_effects(player, enemy)
+
+        return player.is_alive() and not enemy.is_alive()
+
+
+def simulate_fight(player: Player, enemy: Enemy, max_turns: int = MAX_TURNS) -> bool:
+    """Simulate a single silent fight. Returns True if the player wins."""
+    with quiet():
+        return SimulatedCombat(max_turns).run(player, enemy)
+
+
+def win_rate(make_player: Callable[[int], Player], enemy_type: str, level: int,
+             fights: int = 50, enemy_level: Optional[int] = None) -> float:
+    """Return the win rate of players from a factory against an enemy type at a level.
+
+    The enemy is scaled for enemy_level when given, and for the player's level otherwise.
+    """
+    enemy_level = enemy_level or level
+    wins = 0
+    for _ in range(fights):
+        player = make_player(level)
+        enemy = create_enemy(enemy_type, enemy_level)
+        if simulate_fight(player, enemy):
+            wins += 1
+        release_enemy(enemy)
+
+    return wins / fights if fights else 0.0
+
+
+def simulate_matchup(build_name: str, enemy_type: str, level: int,
+                     fights: int = 50, seed: Optional[int] = 0) -> float:
+    """Return the player's win rate for a build against an enemy type at a level."""
+    if seed is not None:
+        random.seed(f"{seed}:{build_name}:{enemy_type}:{level}")
+
+    return win_rate(lambda lvl: create_build(build_name, lvl), enemy_type, level, fights)
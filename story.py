@@ -5,9 +5,65 @@ Manages story progression, character choices, exploration, and narrative branchi
 following the Jujutsu Kaisen manga with player-driven deviations.
 """
 
-from typing import Dict, List, Any, Optional
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+import json
+import os
 import random
-from character import Player, Enemy, Trait
+from character import Player, Enemy, trait_mask
+from enemies import get_enemy_pool, get_enemy_registry
+from story_graph import StoryGraph, get_story_graph, parse_requirements, parse_traits
+
+
+# Calibrated per-level enemy scaling, generated offline by calibration.py
+DIFFICULTY_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     "difficulty_table.json")
+
+_difficulty_table = None
+
+
+def load_difficulty_table(path: str = DIFFICULTY_TABLE_FILE) -> Dict[str, List[List[int]]]:
+    """Load the calibrated difficulty table (enemy type -> [hp, ce] bonus per level)."""
+    global _difficulty_table
+    try:
+        with open(path, 'r') as f:
+            _difficulty_table = json.load(f).get("enemies", {})
+    except (OSError, ValueError):
+        _difficulty_table = {}
+    return _difficulty_table
+
+
+def get_difficulty_table() -> Dict[str, List[List[int]]]:
+    """Get the difficulty table, loading it on first use."""
+    if _difficulty_table is None:
+        return load_difficulty_table()
+    return _difficulty_table
+
+
+def get_enemy_scaling(enemy_type: str, player_level: int) -> Tuple[int, int]:
+    """Get the HP and cursed energy bonus for an enemy type at a player level."""
+    table = get_difficulty_table()
+    level_modifier = max(1, player_level - 1)
+    
+    curve = table.get(enemy_type)
+    if not curve:
+        # Uncalibrated enemies scale linearly
+        return level_modifier * 10, level_modifier * 5
+    
+    index = max(1, player_level) - 1
+    if index < len(curve):
+        hp_bonus, ce_bonus = curve[index]
+        return hp_bonus, ce_bonus
+    
+    # Past the end of the table, continue linearly from the last entry
+    hp_bonus, ce_bonus = curve[-1]
+    extra_levels = index - len(curve) + 1
+    return hp_bonus + extra_levels * 10, ce_bonus + extra_levels * 5
+
+
+def scale_enemy(enemy: Enemy, player_level: int, hp_bonus: int, ce_bonus: int) -> Enemy:
+    """Scale an enemy to a player level with the given HP and cursed energy bonus."""
+    return enemy.reset(max(1, player_level - 1), hp_bonus, ce_bonus)
 
 
 class StoryChoice:
@@ -30,249 +86,57 @@ class StoryScene:
         self.requirements = requirements or {}  # Requirements to access this scene
 
 
+class StoryScenes(Mapping):
+    """Written scenes of a story graph by name, built from their chapter's data on first access."""
+    
+    def __init__(self, graph: StoryGraph):
+        self.graph = graph
+        self._scenes: Dict[int, StoryScene] = {}
+    
+    def __getitem__(self, name: str) -> StoryScene:
+        scene_id = self.graph.scene_id(name)
+        if not self.graph.is_written(scene_id):
+            raise KeyError(name)
+        scene = self._scenes.get(scene_id)
+        if scene is None:
+            scene = self._scenes[scene_id] = self._build_scene(self.graph.scene_data(scene_id))
+        return scene
+    
+    def __contains__(self, name: object) -> bool:
+        # Answered from the compiled graph, without reading any scene text
+        return isinstance(name, str) and self.graph.is_written(self.graph.scene_id(name))
+    
+    def __iter__(self) -> Iterator[str]:
+        return (name for scene_id, name in enumerate(self.graph.names) if self.graph.is_written(scene_id))
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    @staticmethod
+    def _build_scene(data: Dict[str, Any]) -> StoryScene:
+        choices = []
+        for choice in data.get("choices", []):
+            consequences = dict(choice.get("consequences", {}))
+            if "traits" in consequences:
+                consequences["traits"] = parse_traits(consequences["traits"])
+            if "requirements" in consequences:
+                consequences["requirements"] = parse_requirements(consequences["requirements"])
+            choices.append(StoryChoice(choice["text"], consequences))
+        return StoryScene(data["title"], data["description"], choices, data.get("location"),
+                          parse_requirements(data.get("requirements", {})))
+
+
 class StoryManager:
     """Manages the overall story progression and exploration."""
     
-    def __init__(self):
+    def __init__(self, graph: Optional[StoryGraph] = None):
         self.current_scene = "intro"
-        self.story_scenes = {}
+        self.graph = graph or get_story_graph()
+        # Scenes are authored in story_content/ and read per chapter as they are reached
+        self.story_scenes = StoryScenes(self.graph)
         self.exploration_locations = {}
-        self._initialize_story()
         self._initialize_locations()
     
-    def _initialize_story(self):
-        """Initialize all story scenes."""
-        
-        # Introduction Scene
-        intro_choices = [
-            StoryChoice(
-                "Help the injured student immediately",
-                {
-                    "traits": {Trait.COMPASSIONATE: 10, Trait.PROTECTIVE: 5},
-                    "next_scene": "first_mission_compassionate",
-                    "relationships": {"yuji": 10},
-                    "story_flags": {"helped_student": True}
-                }
-            ),
-            StoryChoice(
-                "Assess the situation carefully first",
-                {
-                    "traits": {Trait.ANALYTICAL: 10, Trait.CAUTIOUS: 5},
-                    "next_scene": "first_mission_analytical",
-                    "relationships": {"megumi": 10},
-                    "story_flags": {"assessed_situation": True}
-                }
-            ),
-            StoryChoice(
-                "Charge in to fight the curse immediately",
-                {
-                    "traits": {Trait.AGGRESSIVE: 10, Trait.RECKLESS: 5},
-                    "next_scene": "first_mission_aggressive",
-                    "relationships": {"nobara": 10},
-                    "story_flags": {"fought_immediately": True}
-                }
-            )
-        ]
-        
-        self.story_scenes["intro"] = StoryScene(
-            "Arrival at Tokyo Jujutsu High",
-            """You arrive at Tokyo Jujutsu High as a new first-year student. The imposing 
-traditional buildings are surrounded by powerful barriers, and you can feel the cursed 
-energy in the air. As you walk through the courtyard, you notice a commotion ahead.
-
-A fellow student has been cornered by a Grade 3 cursed spirit near the training grounds. 
-The curse spirit writhes with malevolent energy, and the student looks terrified and injured.
-
-What do you do?""",
-            intro_choices,
-            "Tokyo Jujutsu High - Courtyard"
-        )
-        
-        # Compassionate Path
-        self.story_scenes["first_mission_compassionate"] = StoryScene(
-            "The Rescuer's Path",
-            """You rush to help the injured student without hesitation. Your quick action 
-surprises the cursed spirit, giving you the advantage. As you engage the curse, 
-Yuji Itadori appears, impressed by your immediate response to help others.
-
-"That was brave!" Yuji says with a grin. "You remind me of myself when I first got here."
-
-The curse spirit snarls and prepares to attack both of you.""",
-            [
-                StoryChoice(
-                    "Fight alongside Yuji",
-                    {
-                        "combat": True,
-                        "enemy": "grade_3_curse",
-                        "ally": "yuji",
-                        "traits": {Trait.DETERMINED: 5},
-                        "next_scene": "post_first_battle"
-                    }
-                ),
-                StoryChoice(
-                    "Protect the injured student while Yuji fights",
-                    {
-                        "traits": {Trait.PROTECTIVE: 10},
-                        "relationships": {"yuji": 5, "injured_student": 15},
-                        "next_scene": "protective_outcome"
-                    }
-                )
-            ],
-            "Tokyo Jujutsu High - Training Grounds"
-        )
-        
-        # Analytical Path
-        self.story_scenes["first_mission_analytical"] = StoryScene(
-            "The Strategist's Path",
-            """You carefully observe the cursed spirit, noting its movement patterns and energy 
-signature. Your analytical approach catches the attention of Megumi Fushiguro, who nods 
-approvingly from nearby.
-
-"Smart. Understanding your enemy before acting is crucial," Megumi says quietly. 
-"That curse has a weakness on its left side."
-
-Your careful observation reveals the optimal strategy for defeating this spirit.""",
-            [
-                StoryChoice(
-                    "Use Megumi's advice to exploit the weakness",
-                    {
-                        "combat": True,
-                        "enemy": "grade_3_curse_weakened",
-                        "traits": {Trait.FOCUSED: 10},
-                        "relationships": {"megumi": 10},
-                        "next_scene": "strategic_victory"
-                    }
-                ),
-                StoryChoice(
-                    "Share your own analysis with Megumi",
-                    {
-                        "traits": {Trait.ANALYTICAL: 5, Trait.FOCUSED: 5},
-                        "relationships": {"megumi": 15},
-                        "story_flags": {"impressed_megumi": True},
-                        "next_scene": "analytical_bond"
-                    }
-                )
-            ],
-            "Tokyo Jujutsu High - Training Grounds"
-        )
-        
-        # Aggressive Path
-        self.story_scenes["first_mission_aggressive"] = StoryScene(
-            "The Warrior's Path",
-            """You charge directly at the cursed spirit with fierce determination. Your bold 
-approach catches everyone off guard, including Nobara Kugisaki who was approaching 
-from the other side.
-
-"Finally, someone who doesn't overthink everything!" Nobara grins, readying her hammer 
-and nails. "Let's crush this thing!"
-
-The curse spirit, startled by your aggressive approach, becomes more dangerous but 
-also more reckless.""",
-            [
-                StoryChoice(
-                    "Coordinate with Nobara for a combined assault",
-                    {
-                        "combat": True,
-                        "enemy": "grade_3_curse_enraged",
-                        "ally": "nobara",
-                        "traits": {Trait.AGGRESSIVE: 5},
-                        "relationships": {"nobara": 15},
-                        "next_scene": "aggressive_victory"
-                    }
-                ),
-                StoryChoice(
-                    "Go all-out on your own",
-                    {
-                        "combat": True,
-                        "enemy": "grade_3_curse_enraged",
-                        "traits": {Trait.RECKLESS: 10, Trait.DETERMINED: 5},
-                        "next_scene": "solo_battle"
-                    }
-                )
-            ],
-            "Tokyo Jujutsu High - Training Grounds"
-        )
-        
-        # Meeting Todo Scene
-        self.story_scenes["meet_todo"] = StoryScene(
-            "Encounter with Todo",
-            """During a joint training exercise with Kyoto School, you encounter the imposing 
-figure of Aoi Todo. His massive frame and confident stance make it clear he's evaluating 
-you as a potential sparring partner.
-
-"What's your type of woman?" Todo asks with complete seriousness.
-
-The question catches you off guard, but you realize this might be Todo's way of 
-understanding your character.""",
-            [
-                StoryChoice(
-                    "Give a thoughtful, honest answer",
-                    {
-                        "traits": {Trait.COMPASSIONATE: 5},
-                        "relationships": {"todo": 20},
-                        "story_flags": {"todo_approves": True},
-                        "next_scene": "todo_training"
-                    }
-                ),
-                StoryChoice(
-                    "Deflect with humor",
-                    {
-                        "traits": {Trait.FOCUSED: 5},
-                        "relationships": {"todo": 5},
-                        "next_scene": "todo_neutral"
-                    }
-                ),
-                StoryChoice(
-                    "Challenge him to a fight instead",
-                    {
-                        "traits": {Trait.AGGRESSIVE: 10},
-                        "combat": True,
-                        "enemy": "todo_sparring",
-                        "next_scene": "todo_fight"
-                    }
-                )
-            ],
-            "Kyoto Jujutsu High - Training Grounds"
-        )
-        
-        # Shibuya Incident preparation
-        self.story_scenes["shibuya_preparation"] = StoryScene(
-            "Before the Shibuya Incident",
-            """Halloween night approaches, and intelligence suggests a major cursed spirit 
-incident will occur in Shibuya. You've grown stronger, but this will be your biggest 
-challenge yet. The atmosphere is tense as everyone prepares.
-
-Gojo-sensei is nowhere to be found, and there's a sense of unease among the students 
-and faculty.""",
-            [
-                StoryChoice(
-                    "Volunteer for the front-line assault team",
-                    {
-                        "traits": {Trait.DETERMINED: 10, Trait.PROTECTIVE: 5},
-                        "story_flags": {"frontline_volunteer": True},
-                        "next_scene": "shibuya_frontline"
-                    }
-                ),
-                StoryChoice(
-                    "Request to support rescue operations",
-                    {
-                        "traits": {Trait.COMPASSIONATE: 10, Trait.ANALYTICAL: 5},
-                        "story_flags": {"rescue_volunteer": True},
-                        "next_scene": "shibuya_rescue"
-                    }
-                ),
-                StoryChoice(
-                    "Suggest gathering more intelligence first",
-                    {
-                        "traits": {Trait.CAUTIOUS: 10, Trait.ANALYTICAL: 5},
-                        "story_flags": {"intelligence_focused": True},
-                        "next_scene": "shibuya_intel"
-                    }
-                )
-            ],
-            "Tokyo Jujutsu High - Meeting Room"
-        )
-    
     def _initialize_locations(self):
         """Initialize exploration locations."""
         
@@ -326,17 +190,8 @@ and faculty.""",
     
     def load_story_state(self, game_state):
         """Load story state from saved game."""
-        # Determine current scene based on game state
-        chapter = game_state.current_chapter
-        
-        if chapter <= 2:
-            self.current_scene = "intro"
-        elif chapter <= 5:
-            self.current_scene = "meet_todo"
-        elif chapter <= 10:
-            self.current_scene = "shibuya_preparation"
-        else:
-            self.current_scene = "post_shibuya"
+        # Resume at the entry scene of the chapter file covering the saved chapter
+        self.current_scene = self.graph.entry_scene(game_state.current_chapter)
     
     def display_current_scene(self, game_state):
         """Display the current story scene."""
@@ -387,10 +242,8 @@ and faculty.""",
         
         # Check trait requirements
         if "required_traits" in requirements:
-            player_traits = game_state.player.get_dominant_traits()
-            for required_trait in requirements["required_traits"]:
-                if required_trait not in player_traits:
-                    return False
+            if not game_state.player.has_dominant_traits(trait_mask(requirements["required_traits"])):
+                return False
         
         # Check story flag requirements
         if "required_flags" in requirements:
@@ -418,8 +271,20 @@ and faculty.""",
         
         # Handle story choice
         choice = action["choice"]
+        game_state.mark_choice(self.current_scene, choice.text)
         return self._process_story_choice(choice, game_state)
     
+    def rewind_to_last_choice(self, game_state) -> Optional[str]:
+        """Undo the most recent story choice and return to its scene.
+        
+        Returns the text of the undone choice, or None if there was none.
+        """
+        choice = game_state.rewind_to_choice()
+        if choice is None:
+            return None
+        self.current_scene = choice.scene
+        return choice.choice
+    
     def _process_story_choice(self, choice: StoryChoice, game_state) -> Dict[str, Any]:
         """Process a story choice and apply its consequences."""
         consequences = choice.consequences
@@ -460,41 +325,16 @@ and faculty.""",
         return result
     
     def _create_enemy(self, enemy_type: str, player_level: int) -> Enemy:
-        """Create an enemy based on type and player level."""
-        if enemy_type == "grade_3_curse":
-            enemy = Enemy("Grade 3 Cursed Spirit", 80, 40)
-            enemy.ai_pattern = "aggressive"
-        
-        elif enemy_type == "grade_3_curse_weakened":
-            enemy = Enemy("Weakened Grade 3 Cursed Spirit", 60, 30)
-            enemy.ai_pattern = "defensive"
-        
-        elif enemy_type == "grade_3_curse_enraged":
-            enemy = Enemy("Enraged Grade 3 Cursed Spirit", 100, 50)
-            enemy.ai_pattern = "aggressive"
-        
-        elif enemy_type == "todo_sparring":
-            enemy = Enemy("Aoi Todo (Sparring)", 150, 80, "hard")
-            enemy.ai_pattern = "mixed"
-            enemy.max_phases = 2
-            enemy.phase_transition_messages = [
-                "Todo grins widely and gets serious!",
-                "\"My brother! Show me your true strength!\""
-            ]
+        """Get a pooled enemy of a type scaled to the player level.
         
-        else:
-            # Default enemy
-            enemy = Enemy("Unknown Cursed Spirit", 70, 35)
-        
-        # Scale enemy to player level
-        level_modifier = max(1, player_level - 1)
-        enemy.max_hp += level_modifier * 10
-        enemy.hp = enemy.max_hp
-        enemy.max_cursed_energy += level_modifier * 5
-        enemy.cursed_energy = enemy.max_cursed_energy
-        enemy.level = max(1, player_level - 1)
-        
-        return enemy
+        Release it to get_enemy_pool() once the fight is over.
+        """
+        hp_bonus, ce_bonus = get_enemy_scaling(enemy_type, player_level)
+        return get_enemy_pool().acquire(enemy_type, max(1, player_level - 1), hp_bonus, ce_bonus)
+    
+    def _create_base_enemy(self, enemy_type: str) -> Enemy:
+        """Create a new unscaled enemy from its registry template."""
+        return get_enemy_registry().create_enemy(enemy_type)
     
     def _handle_exploration(self, game_state) -> Dict[str, Any]:
         """Handle exploration actions."""
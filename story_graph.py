@@ -0,0 +1,240 @@
+"""
+Story Scene Graph
+
+Story scenes are authored as data, one JSON file per chapter range in
+story_content/. Each file gives the chapter it starts at, the scene a loaded
+save resumes at, its scenes (title, location, description and choices) and the
+scenes it plans but has not written yet:
+
+    {"chapter": 3, "entry": "meet_todo",
+     "scenes": {"meet_todo": {"title": ..., "choices": [{"text": ..., "consequences": {...}}]}},
+     "unwritten": ["todo_training"]}
+
+The files are compiled into a graph of integer scene ids with flat adjacency
+arrays (each scene's choices point at their next_scene ids). Every next_scene
+target and chapter entry must be a written or planned scene, and every trait
+name must exist, so broken links fail the compile instead of a playthrough.
+The compiled graph is cached in a binary file keyed by the content files'
+mtimes and sizes; scene text and choices are only read from a chapter's file
+when one of its scenes is first needed.
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from character import Trait
+
+
+STORY_CONTENT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "story_content")
+STORY_GRAPH_CACHE_VERSION = 1
+NO_SCENE = -1  # Choice target for choices that stay in the current scene
+
+_TRAITS_BY_NAME = {trait.value: trait for trait in Trait}
+
+
+class StoryCompileError(ValueError):
+    """Story content is malformed or links to scenes that do not exist."""
+
+
+def _content_files(directory: str) -> List[str]:
+    return sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+
+
+def _check_traits(names: Any, where: str):
+    if any(name not in _TRAITS_BY_NAME for name in names):
+        unknown = [name for name in names if name not in _TRAITS_BY_NAME]
+        raise StoryCompileError(f"{where} has unknown traits: {unknown}")
+
+
+def _compile_graph(directory: str, files: List[str]) -> tuple:
+    """Parse and validate every chapter file into plain tuples for the binary cache."""
+    names: List[str] = []
+    scene_files: List[int] = []
+    scene_ids: Dict[str, int] = {}
+    targets: List[List[str]] = []  # Per scene, choice targets by name
+    chapters: List[Tuple[int, str, int]] = []  # (start chapter, entry scene, file index)
+    digest = hashlib.sha256()
+
+    def add_scene(name: str, file_index: int, where: str):
+        if name in scene_ids:
+            raise StoryCompileError(f"{where}: scene {name} is defined twice")
+        scene_ids[name] = len(names)
+        names.append(name)
+        scene_files.append(file_index)
+
+    for file_index, file_name in enumerate(files):
+        with open(os.path.join(directory, file_name), "rb") as f:
+            source = f.read()
+        digest.update(file_name.encode("utf-8") + b"\0" + source + b"\0")
+        try:
+            chapter = json.loads(source.decode("utf-8"))
+            start, entry = int(chapter["chapter"]), chapter["entry"]
+            scenes = chapter.get("scenes", {})
+            unwritten = chapter.get("unwritten", [])
+        except (KeyError, TypeError, ValueError) as e:
+            raise StoryCompileError(f"{file_name} is not a chapter file: {e}")
+        chapters.append((start, entry, file_index))
+
+        for name, scene in scenes.items():
+            add_scene(name, file_index, file_name)
+            _check_traits(scene.get("requirements", {}).get("required_traits", []), f"Scene {name}")
+            scene_targets = []
+            for choice in scene.get("choices", []):
+                consequences = choice.get("consequences", {})
+                _check_traits(consequences.get("traits", {}), f"Choice {choice.get('text')!r} in {name}")
+                _check_traits(consequences.get("requirements", {}).get("required_traits", []),
+                              f"Choice {choice.get('text')!r} in {name}")
+                scene_targets.append(consequences.get("next_scene"))
+            targets.append(scene_targets)
+        for name in unwritten:
+            add_scene(name, NO_SCENE, file_name)
+            targets.append([])
+
+    # Links are checked once every file's scenes are known
+    for name, scene_targets in zip(names, targets):
+        for target in scene_targets:
+            if target is not None and target not in scene_ids:
+                raise StoryCompileError(f"Scene {name} links to missing scene {target}")
+    for start, entry, file_index in chapters:
+        if entry not in scene_ids:
+            raise StoryCompileError(f"{files[file_index]}: entry scene {entry} does not exist")
+    if len({start for start, _, _ in chapters}) != len(chapters):
+        raise StoryCompileError("Two chapter files start at the same chapter")
+
+    offsets = [0]
+    flat_targets = []
+    for scene_targets in targets:
+        flat_targets.extend(NO_SCENE if target is None else scene_ids[target] for target in scene_targets)
+        offsets.append(len(flat_targets))
+
+    chapters.sort()
+    return (names, scene_files, offsets, flat_targets,
+            [start for start, _, _ in chapters], [scene_ids[entry] for _, entry, _ in chapters],
+            digest.hexdigest())
+
+
+def _read_graph_cache(cache_path: str) -> Optional[tuple]:
+    """Read the compiled cache: (file stats, compiled graph) or None."""
+    try:
+        with open(cache_path, "rb") as f:
+            version, stats, compiled = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != STORY_GRAPH_CACHE_VERSION:
+        return None
+    return stats, compiled
+
+
+class StoryGraph:
+    """Compiled story: integer scene ids, choice adjacency arrays and lazily loaded text."""
+
+    def __init__(self, directory: str = STORY_CONTENT_DIRECTORY):
+        self.directory = directory
+        self.files = _content_files(directory)
+        (names, scene_files, offsets, targets, chapter_starts, chapter_entries,
+         self.content_hash) = self._load_compiled()
+
+        self.names: List[str] = names
+        self.scene_ids: Dict[str, int] = {name: scene_id for scene_id, name in enumerate(names)}
+        self.scene_files = array('i', scene_files)  # File index per scene, NO_SCENE if unwritten
+        self.choice_offsets = array('I', offsets)  # Scene i's choices are offsets[i]:offsets[i + 1]
+        self.choice_targets = array('i', targets)  # next_scene id per choice, NO_SCENE if none
+        self.chapter_starts: List[int] = chapter_starts  # Sorted first chapter of each file
+        self.chapter_entries = array('i', chapter_entries)  # Scene a loaded save resumes at
+        self._chapters: Dict[int, Dict[str, Any]] = {}  # File index -> parsed scenes
+        self._lock = threading.Lock()
+
+    def _load_compiled(self) -> tuple:
+        """Load the compiled graph, using the cache when every content file is unchanged."""
+        cache_path = self.directory + ".cache"
+        stats = []
+        for file_name in self.files:
+            stat = os.stat(os.path.join(self.directory, file_name))
+            stats.append((file_name, stat.st_mtime_ns, stat.st_size))
+
+        cache = _read_graph_cache(cache_path)
+        if cache and cache[0] == stats:
+            return cache[1]
+
+        compiled = _compile_graph(self.directory, self.files)
+        try:
+            with open(cache_path, "wb") as f:
+                f.write(marshal.dumps((STORY_GRAPH_CACHE_VERSION, stats, compiled)))
+        except OSError:
+            pass  # Read-only install: compile again next time
+        return compiled
+
+    def scene_id(self, name: str) -> int:
+        """Id of a scene by name, NO_SCENE if there is no such scene."""
+        return self.scene_ids.get(name, NO_SCENE)
+
+    def is_written(self, scene_id: int) -> bool:
+        """Check whether a scene has text and choices, rather than only being planned."""
+        return scene_id != NO_SCENE and self.scene_files[scene_id] != NO_SCENE
+
+    def successors(self, scene_id: int) -> List[int]:
+        """next_scene ids of a scene's choices, in choice order."""
+        return list(self.choice_targets[self.choice_offsets[scene_id]:self.choice_offsets[scene_id + 1]])
+
+    def entry_scene(self, chapter: int) -> str:
+        """Scene a save loaded at a chapter resumes at."""
+        index = max(0, bisect_right(self.chapter_starts, chapter) - 1)
+        return self.names[self.chapter_entries[index]]
+
+    def scene_data(self, scene_id: int) -> Dict[str, Any]:
+        """A written scene's authored data, reading its chapter file on first use."""
+        file_index = self.scene_files[scene_id]
+        scenes = self._chapters.get(file_index)
+        if scenes is None:
+            with self._lock:
+                scenes = self._chapters.get(file_index)
+                if scenes is None:
+                    with open(os.path.join(self.directory, self.files[file_index]), "r", encoding="utf-8") as f:
+                        scenes = self._chapters[file_index] = json.load(f)["scenes"]
+        return scenes[self.names[scene_id]]
+
+    def loaded_chapters(self) -> int:
+        """Number of chapter files whose text has been read."""
+        return len(self._chapters)
+
+
+def parse_traits(values: Dict[str, int]) -> Dict[Trait, int]:
+    """Convert authored trait names to Trait keys."""
+    return {_TRAITS_BY_NAME[name]: value for name, value in values.items()}
+
+
+def parse_requirements(requirements: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert authored required trait names to Traits."""
+    if "required_traits" not in requirements:
+        return requirements
+    return dict(requirements, required_traits=[_TRAITS_BY_NAME[name]
+                                               for name in requirements["required_traits"]])
+
+
+_story_graph: Optional[StoryGraph] = None
+_story_graph_lock = threading.Lock()
+
+
+def get_story_graph() -> StoryGraph:
+    """Get the global story graph, compiling or loading it on first use."""
+    global _story_graph
+    graph = _story_graph
+    if graph is None:
+        with _story_graph_lock:
+            if _story_graph is None:
+                _story_graph = StoryGraph()
+            graph = _story_graph
+    return graph
+
+
+def reset_story_graph():
+    """Discard the global story graph so the next call reloads it (for tests)."""
+    global _story_graph
+    with _story_graph_lock:
+        _story_graph = None
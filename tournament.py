@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Build-vs-Enemy Tournament
+
+Evaluates every registered player build against every enemy type at every level
+and fills a win-probability matrix. The matrix lives in shared memory so worker
+processes write their results in place instead of sending them back.
+"""
+
+import array
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from simulation import PLAYER_BUILDS, ENEMY_TYPES, MAX_LEVEL, simulate_matchup
+
+
+_DOUBLE_SIZE = array.array('d').itemsize
+
+# Per-worker view of the shared matrix, set up by _attach_matrix
+_shm = None
+_matrix = None
+
+
+def _attach_matrix(name: str):
+    """Attach this worker to a tournament's shared result matrix."""
+    global _shm, _matrix
+    if _shm is not None:
+        if _shm.name == name:
+            return
+        # A warm pool outlives tournaments: drop the previous run's matrix
+        _matrix.release()
+        _shm.close()
+    _shm = shared_memory.SharedMemory(name=name)
+    _matrix = _shm.buf.cast('d')
+
+
+def _evaluate_row(task: Tuple[str, Tuple[int, int, int], int, str, int, str, Sequence[int], int, int]):
+    """Simulate one build against one enemy type across all levels."""
+    matrix_name, shape, build_index, build_name, enemy_index, enemy_type, levels, fights, seed = task
+    _attach_matrix(matrix_name)
+    _, num_enemies, num_levels = shape
+    offset = (build_index * num_enemies + enemy_index) * num_levels
+
+    for level_index, level in enumerate(levels):
+        _matrix[offset + level_index] = simulate_matchup(build_name, enemy_type, level, fights, seed)
+
+
+class TournamentResult:
+    """Win-probability matrix indexed by build, enemy type and level."""
+
+    def __init__(self, builds: List[str], enemy_types: List[str], levels: List[int],
+                 values: array.array):
+        self.builds = builds
+        self.enemy_types = enemy_types
+        self.levels = levels
+        self.values = values
+
+    def _index(self, build: str, enemy_type: str, level: int) -> int:
+        b = self.builds.index(build)
+        e = self.enemy_types.index(enemy_type)
+        l = self.levels.index(level)
+        return (b * len(self.enemy_types) + e) * len(self.levels) + l
+
+    def win_rate(self, build: str, enemy_type: str, level: int) -> float:
+        """Get the win rate of a build against an enemy type at a level."""
+        return self.values[self._index(build, enemy_type, level)]
+
+    def to_dict(self) -> Dict[str, Dict[str, List[float]]]:
+        """Convert the matrix to nested build → enemy → per-level win rates."""
+        num_levels = len(self.levels)
+        result = {}
+        for b, build in enumerate(self.builds):
+            result[build] = {}
+            for e, enemy_type in enumerate(self.enemy_types):
+                start = (b * len(self.enemy_types) + e) * num_levels
+                result[build][enemy_type] = list(self.values[start:start + num_levels])
+        return result
+
+    def write_csv(self, path: str):
+        """Write the matrix as CSV with one row per build/enemy pair."""
+        with open(path, 'w') as f:
+            f.write("build,enemy," + ",".join(f"L{level}" for level in self.levels) + "\n")
+            for build, enemies in self.to_dict().items():
+                for enemy_type, rates in enemies.items():
+                    f.write(f"{build},{enemy_type}," + ",".join(f"{r:.3f}" for r in rates) + "\n")
+
+
+def run_tournament(builds: Optional[List[str]] = None, enemy_types: Optional[List[str]] = None,
+                   levels: Optional[List[int]] = None, fights: int = 50, seed: int = 0,
+                   processes: Optional[int] = None, pool=None) -> TournamentResult:
+    """Run every build against every enemy type and level in a process pool.
+
+    Pass a WarmSimulationPool as pool to reuse its workers instead of starting new ones.
+    """
+    builds = list(builds or PLAYER_BUILDS)
+    enemy_types = list(enemy_types or ENEMY_TYPES)
+    levels = list(levels or range(1, MAX_LEVEL + 1))
+    shape = (len(builds), len(enemy_types), len(levels))
+    cells = shape[0] * shape[1] * shape[2]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, cells) * _DOUBLE_SIZE)
+    try:
+        tasks = [
+            (shm.name, shape, b, build, e, enemy_type, levels, fights, seed)
+            for b, build in enumerate(builds)
+            for e, enemy_type in enumerate(enemy_types)
+        ]
+        if pool is not None:
+            for _ in pool.imap_unordered(_evaluate_row, tasks):
+                pass
+        else:
+            with multiprocessing.Pool(processes) as new_pool:
+                for _ in new_pool.imap_unordered(_evaluate_row, tasks):
+                    pass
+
+        view = shm.buf.cast('d')
+        values = array.array('d', view[:cells])
+        view.release()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return TournamentResult(builds, enemy_types, levels, values)
+
+
+def main():
+    """Run the full tournament and print the matrix."""
+    result = run_tournament()
+    for build, enemies in result.to_dict().items():
+        print(f"\n=== {build} ===")
+        for enemy_type, rates in enemies.items():
+            print(f"{enemy_type:<24}" + " ".join(f"{r:4.2f}" for r in rates))
+
+
+if __name__ == "__main__":
+    main()
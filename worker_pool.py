@@ -0,0 +1,98 @@
+"""
+Warm Simulation Worker Pool
+
+A long-lived process pool for simulation batches. The parent builds the content
+catalogs (techniques, NPCs, story and difficulty table) once and forks the
+workers with everything frozen out of the garbage collector, so every worker
+starts from the parent's catalog pages instead of importing and rebuilding its
+own copy. Each batch afterwards only costs sending its task descriptors.
+
+The catalogs are shared copy-on-write, not read-only: a worker that changes a
+catalog object (an NPC's current_relationship, interaction_count or
+unlocked_abilities, say) gets a private copy of the pages it touches. The
+change is never seen by the parent or other workers, but it does carry over
+to later batches in the same worker. The parent unfreezes its own objects
+once the workers are forked.
+"""
+
+import gc
+import multiprocessing
+from multiprocessing import resource_tracker
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from simulation import preload_catalogs, simulate_matchup
+
+
+def _init_worker():
+    """Worker initializer: reuse inherited catalogs, or build them when not forked."""
+    preload_catalogs()
+    # Collections in the worker should not walk the inherited catalog objects
+    gc.freeze()
+
+
+def _run_matchup(task: Tuple[str, str, int, int, int]) -> float:
+    """Simulate one matchup task."""
+    build, enemy_type, level, fights, seed = task
+    return simulate_matchup(build, enemy_type, level, fights, seed)
+
+
+class WarmSimulationPool:
+    """Persistent worker pool with catalogs shared from the parent process."""
+
+    def __init__(self, processes: Optional[int] = None):
+        preload_catalogs()
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+
+        # Start the tracker now so workers share it when they attach to shared memory
+        resource_tracker.ensure_running()
+
+        # Move everything built so far into the permanent generation only while
+        # forking, so child collections do not dirty the shared pages; the parent
+        # goes back to collecting its objects normally right after
+        gc.collect()
+        gc.freeze()
+        try:
+            self.pool = context.Pool(processes, initializer=_init_worker)
+        finally:
+            gc.unfreeze()
+        self.batches = 0
+
+    def map(self, func: Callable, iterable: Iterable, chunksize: Optional[int] = None) -> List[Any]:
+        """Run a picklable function over the iterable in the warm workers."""
+        self.batches += 1
+        return self.pool.map(func, iterable, chunksize)
+
+    def imap_unordered(self, func: Callable, iterable: Iterable, chunksize: int = 1) -> Iterator[Any]:
+        """Like map, but yield results as soon as they finish."""
+        self.batches += 1
+        return self.pool.imap_unordered(func, iterable, chunksize)
+
+    def run_matchups(self, tasks: List[Tuple[str, str, int, int, int]]) -> List[float]:
+        """Simulate (build, enemy_type, level, fights, seed) matchups and return win rates."""
+        return self.map(_run_matchup, tasks)
+
+    def close(self):
+        """Shut the workers down."""
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self) -> "WarmSimulationPool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_default_pool = None
+
+
+def get_simulation_pool(processes: Optional[int] = None) -> WarmSimulationPool:
+    """Get the process-wide warm pool, starting it on first use."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = WarmSimulationPool(processes)
+    return _default_pool